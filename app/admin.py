@@ -1,5 +1,5 @@
 from django.contrib import admin
-from app.models import Exam, Question, StudentResponse, CustomUser
+from app.models import Exam, Question, StudentResponse, CustomUser, PendingSubmission, Job, ScheduledJob
 from django.contrib.auth.admin import UserAdmin
 from .forms import CustomUserCreationForm, CustomUserChangeForm
 
@@ -35,3 +35,32 @@ admin.site.register(Question, QuestionAdmin)
 
 
 admin.site.register(StudentResponse)
+
+
+class PendingSubmissionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'student', 'exam', 'status', 'attempts', 'submitted_at', 'graded_at')
+    list_filter = ('status',)
+
+admin.site.register(PendingSubmission, PendingSubmissionAdmin)
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'key', 'status', 'attempts', 'run_at', 'started_at', 'finished_at', 'duration')
+    list_filter = ('status', 'task')
+    search_fields = ('key',)
+    readonly_fields = ('started_at', 'finished_at', 'duration_ms', 'result', 'error')
+
+    @admin.display(description='Duration', ordering='duration_ms')
+    def duration(self, job):
+        if job.duration_ms is None:
+            return '-'
+        return f"{job.duration_ms / 1000:.2f} s"
+
+admin.site.register(Job, JobAdmin)
+
+
+class ScheduledJobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'task', 'cron', 'enabled', 'next_run_at', 'last_enqueued_at')
+    list_filter = ('enabled', 'task')
+
+admin.site.register(ScheduledJob, ScheduledJobAdmin)
@@ -0,0 +1,161 @@
+import hashlib
+
+import numpy as np
+
+from app.grading import get_answer_key, normalize, option_lookup
+from app.models import ExamStats, QuestionStats, StudentResponse
+
+# Share of the cohort in the upper and lower groups for the discrimination index
+GROUP_FRACTION = 0.27
+HISTOGRAM_BINS = 10
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def load_response_matrix(exam_id, answer_key=None, with_options=False):
+    """
+    Load an exam's graded responses with one query into a students x questions
+    boolean matrix of correct answers.
+
+    Returns (student_ids, usernames, correct, answered) where `correct` and
+    `answered` are aligned with `answer_key.question_ids`. Only students with
+    an ExamResult (a submitted attempt) are included. With `with_options` a
+    fifth matrix holds the selected option index (0-3, -1 for none).
+    """
+    answer_key = answer_key or get_answer_key(exam_id)
+    fields = ['student_id', 'student__username', 'question_id', 'is_correct']
+    if with_options:
+        fields.append('selected_option')
+    rows = list(
+        StudentResponse.objects
+        .filter(exam_id=exam_id, student__examresult__exam_id=exam_id)
+        .values_list(*fields)
+    )
+    if rows:
+        student_col, username_col, question_col, correct_col, *option_col = zip(*rows)
+    else:
+        student_col = username_col = question_col = correct_col = ()
+        option_col = [()]
+
+    question_ids = np.asarray(answer_key.question_ids, dtype=np.int64)
+    response_questions = np.asarray(question_col, dtype=np.int64)
+    # Map question ids to columns; responses to deleted questions are dropped
+    known = np.zeros(len(response_questions), dtype=bool)
+    columns = np.zeros(len(response_questions), dtype=np.int64)
+    if len(question_ids):
+        columns = np.minimum(np.searchsorted(question_ids, response_questions), len(question_ids) - 1)
+        known = question_ids[columns] == response_questions
+
+    student_ids, rows_idx = np.unique(np.asarray(student_col, dtype=np.int64), return_inverse=True)
+    usernames = dict(zip(student_col, username_col))
+
+    correct = np.zeros((len(student_ids), len(question_ids)), dtype=bool)
+    answered = np.zeros((len(student_ids), len(question_ids)), dtype=bool)
+    correct[rows_idx[known], columns[known]] = np.asarray(correct_col, dtype=bool)[known]
+    answered[rows_idx[known], columns[known]] = True
+    matrices = (student_ids, [usernames[s] for s in student_ids.tolist()], correct, answered)
+    if not with_options:
+        return matrices
+
+    lookup = option_lookup(answer_key)
+    selected = np.asarray(
+        [lookup.get(question_id, {}).get(normalize(option), -1) for question_id, option in zip(question_col, option_col[0])],
+        dtype=np.int8,
+    )
+    options = np.full((len(student_ids), len(question_ids)), -1, dtype=np.int8)
+    options[rows_idx[known], columns[known]] = selected[known]
+    return matrices + (options,)
+
+
+def analyze_exam(exam_id):
+    """
+    Score distribution and per-question item statistics for an exam, computed
+    with vector operations over the response matrix.
+    """
+    answer_key = get_answer_key(exam_id)
+    student_ids, usernames, correct, answered = load_response_matrix(exam_id, answer_key)
+    marks = np.asarray([answer_key.marks[q] for q in answer_key.question_ids], dtype=np.float64)
+    n_students = len(student_ids)
+
+    scores = correct @ marks
+    max_score = answer_key.max_score
+    percentages = scores / max_score * 100 if max_score else np.zeros(n_students)
+
+    summary = {
+        'students': n_students,
+        'max_score': max_score,
+        'mean': 0.0, 'std': 0.0, 'min': 0.0, 'max': 0.0,
+        'percentiles': [(p, 0.0) for p in PERCENTILES],
+    }
+    if n_students:
+        summary.update({
+            'mean': float(scores.mean()),
+            'std': float(scores.std()),
+            'min': float(scores.min()),
+            'max': float(scores.max()),
+            'percentiles': list(zip(PERCENTILES, np.percentile(scores, PERCENTILES).tolist())),
+        })
+
+    counts, edges = np.histogram(percentages, bins=HISTOGRAM_BINS, range=(0, 100))
+    histogram = [
+        {'low': int(low), 'high': int(high), 'count': int(count),
+         'share': round(int(count) / n_students * 100, 1) if n_students else 0}
+        for low, high, count in zip(edges[:-1], edges[1:], counts)
+    ]
+
+    # Difficulty: share of attempts answered correctly (higher is easier)
+    attempts = answered.sum(axis=0)
+    correct_counts = correct.sum(axis=0)
+    difficulty = np.divide(correct_counts, attempts, out=np.zeros(len(attempts)), where=attempts > 0)
+
+    # Discrimination: difficulty in the top group minus the bottom group
+    group_size = max(1, int(round(n_students * GROUP_FRACTION))) if n_students else 0
+    discrimination = np.zeros(len(attempts))
+    if n_students >= 2:
+        order = np.argsort(scores, kind='stable')
+        lower, upper = correct[order[:group_size]], correct[order[-group_size:]]
+        discrimination = upper.mean(axis=0) - lower.mean(axis=0)
+
+    questions = [
+        {
+            'question_id': question_id,
+            'correct_count': int(correct_counts[i]),
+            'total_attempts': int(attempts[i]),
+            'difficulty': round(float(difficulty[i]), 3),
+            'discrimination': round(float(discrimination[i]), 3),
+        }
+        for i, question_id in enumerate(answer_key.question_ids)
+    ]
+
+    return {
+        'summary': summary,
+        'histogram': histogram,
+        'questions': questions,
+        'student_ids': student_ids,
+        'usernames': usernames,
+        'scores': scores,
+    }
+
+
+def results_fingerprint(exam_id, answer_key=None):
+    """
+    A digest that changes when an exam's answer key or graded results change.
+    It is read from the database, so background workers and web processes
+    agree on it without sharing a cache.
+    """
+    answer_key = answer_key or get_answer_key(exam_id)
+    totals = ExamStats.objects.filter(exam_id=exam_id).values_list(
+        'attempt_count', 'pass_count', 'score_sum', 'score_sq_sum',
+    ).first()
+    question_totals = list(
+        QuestionStats.objects.filter(exam_id=exam_id).order_by('question_id').values_list(
+            'question_id', 'attempt_count', 'correct_count',
+        )
+    )
+    state = (sorted(answer_key.correct.items()), sorted(answer_key.marks.items()), totals, question_totals)
+    return hashlib.sha1(repr(state).encode()).hexdigest()
+
+
+def analytics_report(exam_id):
+    """analyze_exam() without the per-student arrays, as JSON-friendly data."""
+    analytics = analyze_exam(exam_id)
+    return {'summary': analytics['summary'], 'histogram': analytics['histogram'], 'questions': analytics['questions']}
@@ -0,0 +1,119 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from app import progress
+from app.grading import get_answer_key, normalize
+from app.models import StudentResponse
+
+# Answers saved during an exam are buffered in the cache per StudentExamSession
+# and written to StudentResponse in one statement at most once per
+# AUTOSAVE_FLUSH_INTERVAL seconds, or when the exam is submitted. Each answer
+# has its own cache key, so concurrent saves never overwrite each other, and
+# buffered answers stay in the cache until the attempt ends.
+FLUSH_INTERVAL = getattr(settings, 'AUTOSAVE_FLUSH_INTERVAL', 30)
+BUFFER_TIMEOUT = getattr(settings, 'AUTOSAVE_BUFFER_TIMEOUT', 24 * 60 * 60)
+
+
+def _answer_key(session_id, question_id):
+    return f"autosave:{session_id}:{question_id}"
+
+
+def _flushed_at_key(session_id):
+    return f"autosave:{session_id}:flushed_at"
+
+
+def _buffered(session, answer_key):
+    keys = {_answer_key(session.id, question_id): question_id for question_id in answer_key.question_ids}
+    return {keys[key]: option for key, option in cache.get_many(keys).items()}
+
+
+def buffer_answer(session, question_id, selected_option, answer_key=None):
+    """
+    Buffer one answer and flush the buffer if the interval has passed.
+    Returns True when the answer was written to the database.
+    """
+    cache.set(_answer_key(session.id, question_id), selected_option, BUFFER_TIMEOUT)
+
+    now = time.time()
+    flushed_at = cache.get(_flushed_at_key(session.id))
+    if flushed_at is None and FLUSH_INTERVAL:
+        # First save of the session starts the interval instead of writing.
+        cache.set(_flushed_at_key(session.id), now, BUFFER_TIMEOUT)
+    elif flushed_at is None or now - flushed_at >= FLUSH_INTERVAL:
+        flush(session, answer_key)
+        return True
+    return False
+
+
+def flush(session, answer_key=None):
+    """Write buffered answers to StudentResponse with a single upsert."""
+    answer_key = answer_key or get_answer_key(session.exam_id)
+    buffer = _buffered(session, answer_key)
+    cache.set(_flushed_at_key(session.id), time.time(), BUFFER_TIMEOUT)
+    if not buffer:
+        return 0
+
+    # Graded rows of an earlier attempt stay as graded until this attempt is
+    # submitted; answers to those questions remain in the buffer.
+    graded = set(
+        StudentResponse.objects
+        .filter(
+            student_id=session.student_id, exam_id=session.exam_id,
+            question_id__in=list(buffer), timestamp__lt=session.start_time,
+        )
+        .values_list('question_id', flat=True)
+    )
+    now = timezone.now()
+    responses = [
+        StudentResponse(
+            student_id=session.student_id,
+            exam_id=session.exam_id,
+            question_id=question_id,
+            selected_option=selected_option.strip(),
+            is_correct=normalize(selected_option) == answer_key.correct[question_id],
+            timestamp=now,
+        )
+        for question_id, selected_option in buffer.items()
+        if question_id not in graded
+    ]
+    if not responses:
+        return 0
+    StudentResponse.objects.bulk_create(
+        responses,
+        update_conflicts=True,
+        unique_fields=(
+            ['student', 'exam', 'question']
+            if connection.features.supports_update_conflicts_with_target else None
+        ),
+        update_fields=['selected_option', 'is_correct', 'timestamp'],
+    )
+    progress.invalidate(session.exam_id, session.student_id)
+    return len(responses)
+
+
+def saved_answers(session, answer_key=None):
+    """
+    Answers saved so far in this session, keyed "question_<id>" like the
+    exam form: rows already flushed plus whatever is still buffered.
+    """
+    answers = {
+        f"question_{question_id}": selected_option
+        for question_id, selected_option in StudentResponse.objects
+        .filter(student_id=session.student_id, exam_id=session.exam_id, timestamp__gte=session.start_time)
+        .values_list('question_id', 'selected_option')
+    }
+    buffer = _buffered(session, answer_key or get_answer_key(session.exam_id))
+    answers.update((f"question_{question_id}", option) for question_id, option in buffer.items())
+    return answers
+
+
+def discard(session, answer_key=None):
+    answer_key = answer_key or get_answer_key(session.exam_id)
+    cache.delete_many(
+        [_answer_key(session.id, question_id) for question_id in answer_key.question_ids]
+        + [_flushed_at_key(session.id)]
+    )
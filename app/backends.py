@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from app.caching import user_version
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps the user loaded on every authenticated request in
+    the cache. The key includes the user version, bumped whenever the user is
+    saved (profile edits, password changes, last_login), so it is never stale.
+    """
+
+    def get_user(self, user_id):
+        cache_key = f"auth_user:{user_id}:{user_version(user_id)}"
+        user = cache.get(cache_key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(cache_key, user, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 15 * 60))
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from app.routers import reading_from_replica
+
+
+class LRUCache:
+    """Small thread-safe in-process LRU used in front of Django's cache."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Versioned keys
+#
+# Each exam has a version number kept in Django's cache. Cached data derived
+# from the exam (answer key, rendered paper, ...) is stored under a key that
+# includes the version, so bumping the version invalidates all of it at once.
+# A missing version starts from the current time in milliseconds, which keeps
+# it ahead of any version that was evicted.
+
+def _version_key(namespace, obj_id):
+    return f"version:{namespace}:{obj_id}"
+
+
+def get_version(namespace, obj_id):
+    key = _version_key(namespace, obj_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace, obj_id):
+    key = _version_key(namespace, obj_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(key, version, None)
+        return version
+
+
+def exam_version(exam_id):
+    return get_version('exam', exam_id)
+
+
+def bump_exam_version(exam_id):
+    return bump_version('exam', exam_id)
+
+
+def results_version(exam_id):
+    return get_version('results', exam_id)
+
+
+def bump_results_version(exam_id):
+    return bump_version('results', exam_id)
+
+
+def teacher_version(teacher_id):
+    return get_version('teacher', teacher_id)
+
+
+def bump_teacher_version(teacher_id):
+    return bump_version('teacher', teacher_id)
+
+
+# The catalog version covers pages listing every exam (home page, question
+# dashboard); any exam change bumps it.
+
+def catalog_version():
+    return get_version('catalog', 'exams')
+
+
+def bump_catalog_version():
+    return bump_version('catalog', 'exams')
+
+
+def user_version(user_id):
+    return get_version('user', user_id)
+
+
+def bump_user_version(user_id):
+    return bump_version('user', user_id)
+
+
+def report_timeout(timeout):
+    """
+    Cache timeout for a report built in this request. A report read from the
+    replica may trail the primary, so it is kept only briefly.
+    """
+    if reading_from_replica():
+        return min(timeout, getattr(settings, 'REPLICA_CACHE_TIMEOUT', 60))
+    return timeout
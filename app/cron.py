@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+# Minimal five-field cron expressions: minute hour day-of-month month
+# day-of-week, each "*", "*/n", "a", "a-b", "a-b/n" or a comma list of those.
+# Day of week runs 0-6 from Sunday (7 is Sunday too). As in cron, when both
+# day fields are restricted a day matching either one is due.
+
+FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 7),
+)
+
+
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        part, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = end = int(part)
+            if step > 1:
+                end = high
+        if not (low <= start <= end <= high) or step < 1:
+            raise ValueError(f"Invalid cron field {text!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class Cron:
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != len(FIELDS):
+            raise ValueError(f"Cron expression needs {len(FIELDS)} fields: {expression!r}")
+        self.expression = expression
+        for (name, low, high), text in zip(FIELDS, parts):
+            setattr(self, name, _parse_field(text, low, high))
+        if 7 in self.weekday:
+            self.weekday = (self.weekday - {7}) | {0}
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    def _day_matches(self, moment):
+        day = moment.day in self.day
+        weekday = (moment.weekday() + 1) % 7 in self.weekday
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment):
+        """The first due minute strictly after `moment`."""
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Five years covers every valid expression (29 February included)
+        limit = moment + timedelta(days=5 * 366)
+        while moment < limit:
+            if moment.month not in self.month:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hour:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minute:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression is never due: {self.expression!r}")
@@ -0,0 +1,56 @@
+import csv
+from itertools import groupby
+
+from django.conf import settings
+
+from app.grading import get_answer_key
+from app.models import StudentResponse
+
+RESULT_COLUMNS = ['Username', 'First name', 'Last name', 'Score', 'Max score', 'Percentage', 'Grade', 'Passed', 'Submitted at']
+
+
+class Echo:
+    """File-like object whose write() just returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def exam_result_rows(exam_id):
+    """
+    Yield the CSV export of an exam: a header, then one row per graded
+    student with their result and the option they selected for each question.
+
+    Responses are read with a server-side iterator ordered by student, so
+    memory use does not grow with the number of rows.
+    """
+    answer_key = get_answer_key(exam_id)
+    columns = {question_id: index for index, question_id in enumerate(answer_key.question_ids)}
+    yield RESULT_COLUMNS + [f"Q{index + 1}" for index in range(len(columns))]
+
+    rows = (
+        StudentResponse.objects
+        .filter(exam_id=exam_id, student__examresult__exam_id=exam_id)
+        .order_by('student_id', 'question_id')
+        .values_list(
+            'student_id', 'student__username', 'student__first_name', 'student__last_name',
+            'student__examresult__score', 'student__examresult__max_score', 'student__examresult__percentage',
+            'student__examresult__grade', 'student__examresult__passed', 'student__examresult__submitted_at',
+            'question_id', 'selected_option',
+        )
+        .iterator(chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000))
+    )
+    for _, student_rows in groupby(rows, key=lambda row: row[0]):
+        answers = [''] * len(columns)
+        for row in student_rows:
+            if row[10] in columns:
+                answers[columns[row[10]]] = row[11]
+        result = list(row[1:10])
+        result[8] = result[8].isoformat() if result[8] else ''
+        yield result + answers
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
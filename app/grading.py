@@ -0,0 +1,244 @@
+import logging
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from app import progress, ranking, running_stats
+from app.caching import LRUCache, bump_results_version, bump_teacher_version
+from app.models import Exam, ExamResult, Question, StudentResponse
+
+logger = logging.getLogger(__name__)
+
+NOT_ANSWERED = "Not Answered"
+
+
+# ✅ Normalize helper
+def normalize(value):
+    return value.strip().lower() if value else ""
+
+
+class QueryCounter:
+    """Execute wrapper that counts the queries run on a connection."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    exam_id: int
+    version: int        # the exam's answer_key_revision
+    question_ids: tuple
+    options: dict       # question id -> (option1, option2, option3, option4)
+    correct_text: dict  # question id -> text of the correct option
+    correct: dict       # question id -> normalized correct value
+    marks: dict         # question id -> marks
+    max_score: int
+
+
+_answer_keys = LRUCache(maxsize=getattr(settings, 'ANSWER_KEY_LRU_SIZE', 256))
+
+
+def compile_answer_key(exam_id, version):
+    rows = (
+        Question.objects
+        .filter(exam_id=exam_id)
+        .order_by('id')
+        .values_list('id', 'option1', 'option2', 'option3', 'option4', 'correct_option', 'marks')
+    )
+    options, correct_text, correct, marks = {}, {}, {}, {}
+    for question_id, option1, option2, option3, option4, correct_option, question_marks in rows:
+        options[question_id] = (option1, option2, option3, option4)
+        text = {'option1': option1, 'option2': option2, 'option3': option3, 'option4': option4}.get(correct_option, "")
+        correct_text[question_id] = text
+        correct[question_id] = normalize(text)
+        marks[question_id] = question_marks
+    return AnswerKey(
+        exam_id=exam_id,
+        version=version,
+        question_ids=tuple(options),
+        options=options,
+        correct_text=correct_text,
+        correct=correct,
+        marks=marks,
+        max_score=sum(marks.values()),
+    )
+
+
+def get_answer_key(exam_id, revision=None):
+    """
+    Return the compiled answer key of an exam.
+
+    Keyed on the exam's `answer_key_revision`, which saving or deleting a
+    Question bumps in the database (see app/signals.py), so every process
+    agrees on it whatever the cache backend. Callers that have the exam row
+    pass its revision; otherwise it is read with one query. The key is then
+    looked up in the in-process LRU first, then in Django's cache, and only
+    compiled from the database when neither has it.
+    """
+    if revision is None:
+        revision = Exam.objects.filter(pk=exam_id).values_list('answer_key_revision', flat=True).first()
+    lru_key = (exam_id, revision)
+    answer_key = _answer_keys.get(lru_key)
+    if answer_key is None:
+        cache_key = f"answer_key:{exam_id}:rev{revision}"
+        answer_key = cache.get(cache_key)
+        if answer_key is None:
+            answer_key = compile_answer_key(exam_id, revision)
+            cache.set(cache_key, answer_key, getattr(settings, 'ANSWER_KEY_CACHE_TIMEOUT', 60 * 60))
+        _answer_keys.set(lru_key, answer_key)
+    return answer_key
+
+
+def option_lookup(answer_key):
+    """Question id -> {normalized option text: option index 0-3}."""
+    return {
+        question_id: {normalize(text): index for index, text in enumerate(texts)}
+        for question_id, texts in answer_key.options.items()
+    }
+
+
+def get_grade(percentage):
+    if percentage >= 90:
+        return "A+"
+    elif percentage >= 80:
+        return "A"
+    elif percentage >= 70:
+        return "B"
+    elif percentage >= 60:
+        return "C"
+    elif percentage >= 50:
+        return "D"
+    else:
+        return "F"
+
+
+@dataclass
+class GradingResult:
+    score: int
+    max_score: int
+    percentage: float
+    grade: str
+    passed: bool
+    answered: int
+    query_count: int
+    elapsed_ms: float
+
+
+def grade_submission(student, exam, answers, answer_key=None):
+    """
+    Score a whole submission in memory and store every response at once.
+
+    `answers` maps "question_<id>" to the selected option text (request.POST).
+    Old responses are replaced inside the same transaction, so a reattempt
+    never leaves a half-written paper behind, and the exam's running totals
+    (app/running_stats.py) are updated alongside.
+    """
+    counter = QueryCounter()
+    started = time.perf_counter()
+    now = timezone.now()
+    if answer_key is None:
+        with connection.execute_wrapper(counter):
+            answer_key = get_answer_key(exam.id, exam.answer_key_revision)
+
+    score = 0
+    max_score = answer_key.max_score
+    answered = 0
+    responses = []
+    for question_id in answer_key.question_ids:
+        selected_option_raw = answers.get(f"question_{question_id}")
+
+        if not selected_option_raw:
+            is_correct = False
+        else:
+            answered += 1
+            is_correct = normalize(selected_option_raw) == answer_key.correct[question_id]
+
+        if is_correct:
+            score += answer_key.marks[question_id]
+
+        responses.append(StudentResponse(
+            student=student,
+            exam=exam,
+            question_id=question_id,
+            selected_option=selected_option_raw.strip() if selected_option_raw else NOT_ANSWERED,  # Store original text
+            is_correct=is_correct,
+            timestamp=now,
+        ))
+
+    percentage = (score / max_score) * 100 if max_score > 0 else 0
+    summary = {
+        'score': score,
+        'max_score': max_score,
+        'percentage': round(percentage, 2),
+        'grade': get_grade(round(percentage, 2)),
+        'passed': score >= exam.passing_marks,
+        'submitted_at': now,
+    }
+
+    with connection.execute_wrapper(counter):
+        with transaction.atomic():
+            # A reattempt replaces the graded attempt in the running totals
+            previous = (
+                ExamResult.objects
+                .filter(student=student, exam=exam)
+                .values_list('score', 'passed', 'submitted_at')
+                .first()
+            )
+            previous_outcomes = []
+            if previous is not None:
+                # Rows saved after that grading are autosaves of this attempt
+                previous_outcomes = list(
+                    StudentResponse.objects
+                    .filter(student=student, exam=exam, timestamp__lte=previous[2])
+                    .values_list('question_id', 'is_correct')
+                )
+
+            # ✅ Clear old responses if reattempt
+            StudentResponse.objects.filter(student=student, exam=exam).delete()
+            StudentResponse.objects.bulk_create(responses)
+
+            # Materialized summary, read by result pages and analytics
+            updated = ExamResult.objects.filter(student=student, exam=exam).update(attempt=F('attempt') + 1, **summary)
+            if not updated:
+                ExamResult.objects.create(student=student, exam=exam, **summary)
+
+            running_stats.record_attempt(
+                exam.id, score, summary['passed'],
+                [(response.question_id, response.is_correct) for response in responses],
+                previous=previous[:2] if previous is not None else None,
+                previous_outcomes=previous_outcomes,
+            )
+
+            progress.set_answered(exam.id, student.id, len(responses))
+            transaction.on_commit(lambda: bump_results_version(exam.id))
+            transaction.on_commit(lambda: ranking.record_score(
+                exam.id, score, previous[0] if previous is not None else None,
+            ))
+            if exam.created_by_id:
+                transaction.on_commit(lambda: bump_teacher_version(exam.created_by_id))
+
+    result = GradingResult(
+        score=score,
+        max_score=max_score,
+        percentage=percentage,
+        grade=summary['grade'],
+        passed=summary['passed'],
+        answered=answered,
+        query_count=counter.count,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+    )
+    logger.info(
+        "Graded exam %s for student %s: %d questions, %d queries, %.1f ms",
+        exam.id, student.id, len(responses), result.query_count, result.elapsed_ms,
+    )
+    return result
@@ -0,0 +1,155 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from app import jobs
+from app.analytics import GROUP_FRACTION, load_response_matrix, results_fingerprint
+from app.caching import exam_version, report_timeout, results_version
+from app.grading import get_answer_key, option_lookup
+from app.models import ExamStats
+
+logger = logging.getLogger(__name__)
+
+# Cohorts up to ITEM_ANALYSIS_SYNC_LIMIT students are analysed in the request.
+# Larger ones are computed in the background, by `manage.py runjobs` when
+# REPORTS_MODE is 'jobs' and on a thread otherwise; the page shows the last
+# finished report (or a notice) until the new one is ready.
+SYNC_LIMIT = getattr(settings, 'ITEM_ANALYSIS_SYNC_LIMIT', 2000)
+CACHE_TIMEOUT = getattr(settings, 'ITEM_ANALYSIS_CACHE_TIMEOUT', 24 * 60 * 60)
+LOCK_TIMEOUT = 10 * 60
+OPTIONS = ('option1', 'option2', 'option3', 'option4')
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='item-analysis')
+
+
+def _report_key(exam_id):
+    return f"item_analysis:{exam_id}:{exam_version(exam_id)}:{results_version(exam_id)}"
+
+
+def _latest_key(exam_id):
+    return f"item_analysis:{exam_id}:latest"
+
+
+def _reliability(item_scores):
+    # Cronbach's alpha; on 0/1 item scores this is KR-20
+    n_students, n_items = item_scores.shape
+    if n_items < 2 or n_students < 2:
+        return None
+    total_var = item_scores.sum(axis=1).var()
+    if total_var == 0:
+        return None
+    return float(n_items / (n_items - 1) * (1 - item_scores.var(axis=0).sum() / total_var))
+
+
+def _correlate_columns(a, b):
+    # Pearson correlation of each column of `a` with the same column of `b`
+    a = a - a.mean(axis=0)
+    b = b - b.mean(axis=0)
+    denominator = np.sqrt((a * a).sum(axis=0) * (b * b).sum(axis=0))
+    return np.divide((a * b).sum(axis=0), denominator, out=np.zeros(a.shape[1]), where=denominator > 0)
+
+
+def compute_item_analysis(exam_id):
+    """
+    Reliability, item statistics and distractor analysis for an exam, computed
+    over the students x questions response matrix.
+    """
+    answer_key = get_answer_key(exam_id)
+    student_ids, _, correct, _, options = load_response_matrix(exam_id, answer_key, with_options=True)
+    marks = np.asarray([answer_key.marks[q] for q in answer_key.question_ids], dtype=np.float64)
+    n_students, n_items = correct.shape
+
+    items = correct.astype(np.float64)
+    item_scores = items * marks
+    totals = item_scores.sum(axis=1)
+
+    # Point-biserial against the rest score, so an item is not correlated with itself
+    point_biserial = _correlate_columns(items, totals[:, None] - item_scores)
+
+    group_size = max(1, int(round(n_students * GROUP_FRACTION))) if n_students else 0
+    order = np.argsort(totals, kind='stable')
+    upper, lower = order[len(order) - group_size:], order[:group_size]
+
+    # choice_counts[g][o, j]: students in group g who picked option o on question j
+    choices = np.arange(len(OPTIONS), dtype=np.int8)[:, None, None]
+    groups = {'all': options, 'upper': options[upper], 'lower': options[lower]}
+    choice_counts = {name: (group[None, :, :] == choices).sum(axis=1) for name, group in groups.items()}
+    group_sizes = {name: max(1, len(group)) for name, group in groups.items()}
+
+    lookup = option_lookup(answer_key)
+    questions = []
+    for j, question_id in enumerate(answer_key.question_ids):
+        correct_index = lookup[question_id].get(answer_key.correct[question_id], -1)
+        distractors = [
+            {
+                'option': OPTIONS[o],
+                'text': answer_key.options[question_id][o],
+                'is_correct': o == correct_index,
+                'count': int(choice_counts['all'][o, j]),
+                'share': round(choice_counts['all'][o, j] / group_sizes['all'] * 100, 1),
+                'upper_share': round(choice_counts['upper'][o, j] / group_sizes['upper'] * 100, 1),
+                'lower_share': round(choice_counts['lower'][o, j] / group_sizes['lower'] * 100, 1),
+            }
+            for o in range(len(OPTIONS))
+        ]
+        questions.append({
+            'question_id': question_id,
+            'difficulty': round(float(items[:, j].mean()), 3) if n_students else 0,
+            'point_biserial': round(float(point_biserial[j]), 3),
+            'discrimination': round(float(items[upper, j].mean() - items[lower, j].mean()), 3) if n_students >= 2 else 0,
+            # Skipped questions are graded as "Not Answered" rows, which match no option
+            'unanswered': int((options[:, j] < 0).sum()),
+            'distractors': distractors,
+        })
+
+    return {
+        'students': n_students,
+        'items': n_items,
+        'kr20': _reliability(items),
+        'alpha': _reliability(item_scores),
+        'questions': questions,
+    }
+
+
+def _compute_and_cache(exam_id, key):
+    try:
+        report = compute_item_analysis(exam_id)
+        cache.set(key, report, CACHE_TIMEOUT)
+        cache.set(_latest_key(exam_id), report, CACHE_TIMEOUT)
+    except Exception:
+        logger.exception("Item analysis of exam %s failed", exam_id)
+    finally:
+        cache.delete(f"{key}:lock")
+        connection.close()
+
+
+def get_item_analysis(exam_id):
+    """
+    Return (report, pending). `pending` is True while a background run for
+    the current results is still going; `report` is then the last finished
+    report, or None.
+    """
+    key = _report_key(exam_id)
+    report = cache.get(key)
+    if report is not None:
+        return report, False
+
+    students = ExamStats.objects.filter(exam_id=exam_id).values_list('attempt_count', flat=True).first() or 0
+    if students <= SYNC_LIMIT:
+        report = compute_item_analysis(exam_id)
+        cache.set(key, report, report_timeout(CACHE_TIMEOUT))
+        cache.set(_latest_key(exam_id), report, report_timeout(CACHE_TIMEOUT))
+        return report, False
+
+    if jobs.reports_in_background():
+        # Computed by `manage.py runjobs`, which does not share this cache
+        return jobs.precomputed('item_analysis', f"item_analysis:{exam_id}", results_fingerprint(exam_id), exam_id=exam_id)
+
+    # Only one run per version, however many teachers open the page
+    if cache.add(f"{key}:lock", True, LOCK_TIMEOUT):
+        _executor.submit(_compute_and_cache, exam_id, key)
+    return cache.get(_latest_key(exam_id)), True
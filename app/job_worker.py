@@ -0,0 +1,18 @@
+# Entry points of the `manage.py runjobs` worker processes. They are started
+# with the spawn method, which imports this module before Django is set up,
+# so nothing here may import Django or app modules at module level.
+
+
+def init():
+    import django
+    django.setup()
+
+
+def run(job_id):
+    from django.db import connection
+
+    from app import jobs
+    try:
+        return jobs.execute(job_id)
+    finally:
+        connection.close()
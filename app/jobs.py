@@ -0,0 +1,172 @@
+import logging
+import time
+import traceback
+from collections import Counter
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from app.cron import Cron
+from app.models import Job, ScheduledJob
+
+logger = logging.getLogger(__name__)
+
+# Background jobs: work is stored in the Job table and executed by
+# `manage.py runjobs`. Tasks are registered with @task (see app/tasks.py);
+# a task returns a JSON-serialisable result, stored on the job.
+
+RETRY_DELAY = getattr(settings, 'JOBS_RETRY_DELAY', 30)
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: object
+    max_concurrency: int
+    max_attempts: int
+
+
+registry = {}
+
+
+def task(name, max_concurrency=1, max_attempts=3):
+    """Register a function as a background task called with the job's args."""
+    def register(func):
+        registry[name] = Task(name, func, max_concurrency, max_attempts)
+        return func
+    return register
+
+
+def reports_in_background():
+    return getattr(settings, 'REPORTS_MODE', 'inline') == 'jobs'
+
+
+def enqueue(task_name, key='', run_at=None, **args):
+    """
+    Add a job unless one with the same key is already waiting or running.
+    Returns the new job, or None when it was a duplicate.
+    """
+    if key and Job.objects.filter(key=key, status__in=['pending', 'running']).exists():
+        return None
+    max_attempts = registry[task_name].max_attempts if task_name in registry else 3
+    return Job.objects.create(
+        task=task_name, key=key, args=args, max_attempts=max_attempts, run_at=run_at or timezone.now(),
+    )
+
+
+def latest_result(key):
+    """Result of the most recent successful job with this key, or None."""
+    return (
+        Job.objects
+        .filter(key=key, status='done')
+        .order_by('-finished_at')
+        .values_list('result', flat=True)
+        .first()
+    )
+
+
+def precomputed(task_name, key, fingerprint, **args):
+    """
+    Return (data, stale) for a report computed by `task_name`.
+
+    The task stores {'fingerprint': ..., 'data': ...}. When the stored
+    fingerprint differs from the current one a refresh is enqueued and the
+    previous data (or None) is returned meanwhile.
+    """
+    result = latest_result(key)
+    stale = result is None or result.get('fingerprint') != fingerprint
+    if stale:
+        enqueue(task_name, key=key, **args)
+    return (result or {}).get('data'), stale
+
+
+def schedule_due(now=None):
+    """Enqueue a job for every scheduled job that is due; returns how many."""
+    now = now or timezone.now()
+    enqueued = 0
+    for scheduled in ScheduledJob.objects.filter(enabled=True):
+        cron = Cron(scheduled.cron)
+        if scheduled.next_run_at is None:
+            next_run_at = cron.next_after(timezone.localtime(now))
+            ScheduledJob.objects.filter(id=scheduled.id, next_run_at__isnull=True).update(next_run_at=next_run_at)
+            continue
+        if scheduled.next_run_at > now:
+            continue
+        next_run_at = cron.next_after(timezone.localtime(now))
+        # Conditional update: with several workers only one enqueues each run
+        with transaction.atomic():
+            if ScheduledJob.objects.filter(id=scheduled.id, next_run_at=scheduled.next_run_at).update(
+                next_run_at=next_run_at, last_enqueued_at=now,
+            ):
+                enqueue(scheduled.task, key=f"scheduled:{scheduled.id}", **scheduled.args)
+                enqueued += 1
+    return enqueued
+
+
+def requeue_stale(older_than):
+    """Give jobs claimed by a worker that died back to the queue."""
+    cutoff = timezone.now() - older_than
+    return Job.objects.filter(status='running', started_at__lt=cutoff).update(status='pending')
+
+
+def claim(slots):
+    """
+    Claim up to `slots` due jobs, oldest first, without exceeding any task's
+    max_concurrency across all workers. Returns the claimed job ids.
+    """
+    if slots <= 0:
+        return []
+    now = timezone.now()
+    running = Counter(Job.objects.filter(status='running').values_list('task', flat=True))
+    candidates = (
+        Job.objects
+        .filter(status='pending', run_at__lte=now)
+        .order_by('run_at', 'id')
+        .values_list('id', 'task')[:slots * 4]
+    )
+    claimed = []
+    for job_id, task_name in candidates:
+        limit = registry[task_name].max_concurrency if task_name in registry else 1
+        if running[task_name] >= limit:
+            continue
+        if Job.objects.filter(id=job_id, status='pending').update(
+            status='running', started_at=now, attempts=F('attempts') + 1,
+        ):
+            running[task_name] += 1
+            claimed.append(job_id)
+            if len(claimed) == slots:
+                break
+    return claimed
+
+
+def execute(job_id):
+    """Run one claimed job and record its outcome. Returns the final status."""
+    job = Job.objects.get(id=job_id)
+    started = time.perf_counter()
+    try:
+        if job.task not in registry:
+            raise LookupError(f"Unknown task {job.task!r}")
+        result = registry[job.task].func(**job.args)
+    except Exception:
+        error = traceback.format_exc()
+        logger.error("Job %s (%s) failed:\n%s", job.id, job.task, error)
+        retry = job.attempts < job.max_attempts
+        Job.objects.filter(id=job.id).update(
+            status='pending' if retry else 'failed',
+            run_at=timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1)),
+            finished_at=None if retry else timezone.now(),
+            duration_ms=(time.perf_counter() - started) * 1000,
+            error=error,
+        )
+        return 'pending' if retry else 'failed'
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    Job.objects.filter(id=job.id).update(
+        status='done', finished_at=timezone.now(), duration_ms=duration_ms, result=result, error=None,
+    )
+    logger.info("Job %s (%s) done in %.1f ms", job.id, job.task, duration_ms)
+    return 'done'
@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from app import submission_queue
+
+
+class Command(BaseCommand):
+    help = "Grade spooled exam submissions (EXAM_SUBMISSION_MODE = 'queued')."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Grading threads.')
+        parser.add_argument('--batch-size', type=int, default=50, help='Submissions graded per transaction.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the spool instead of exiting when it is empty.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the spool is empty.')
+        parser.add_argument('--max-attempts', type=int, default=3, help='Failures before a submission is marked failed.')
+        parser.add_argument('--stale-after', type=int, default=600, help='Seconds before a claimed submission is requeued.')
+
+    def handle(self, *args, **options):
+        requeued = submission_queue.requeue_stale(timedelta(seconds=options['stale_after']))
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale submission(s).")
+
+        total_done = total_failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                started = time.perf_counter()
+                # Claim enough work to keep every thread busy with one batch.
+                batches = []
+                for _ in range(options['workers']):
+                    batch = submission_queue.claim(options['batch_size'])
+                    if not batch:
+                        break
+                    batches.append(batch)
+
+                if not batches:
+                    if not options['loop']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                results = pool.map(
+                    lambda batch: submission_queue.grade_batch(batch, options['max_attempts']),
+                    batches,
+                )
+                done = failed = 0
+                for batch_done, batch_failed in results:
+                    done += batch_done
+                    failed += batch_failed
+                total_done += done
+                total_failed += failed
+                self.stdout.write(
+                    f"Graded {done} submission(s), {failed} failed, in {time.perf_counter() - started:.2f}s."
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total_done} graded, {total_failed} failed."))
@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from app.grading import QueryCounter
+from app.models import CustomUser, Exam, Question
+
+PASSWORD = 'loadtest-password'
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate exam-day traffic: N students log in, open the instructions and "
+        "the exam, submit and view their result. Runs against a throwaway test "
+        "database and prints throughput, latency percentiles and query totals as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100, help='Simulated students.')
+        parser.add_argument('--concurrency', type=int, default=20, help='Students active at the same time.')
+        parser.add_argument('--questions', type=int, default=20, help='Questions on the exam paper.')
+        parser.add_argument('--think-time', type=float, default=0.5, help='Maximum random pause between steps, in seconds.')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for answers and think times.')
+        parser.add_argument('--db-file', help='SQLite file for the throwaway database (default: a temporary file).')
+        parser.add_argument('--output', help='Also write the JSON report to this file.')
+        parser.add_argument(
+            '--scenario', choices=['exam-day', 'concurrent-submit'], default='exam-day',
+            help='exam-day walks every student through the whole exam; concurrent-submit '
+                 'logs everyone in first and then sends all submissions at the same moment.',
+        )
+        parser.add_argument(
+            '--sqlite-tuning', action=argparse.BooleanOptionalAction, default=True,
+            help='Use the SQLite PRAGMAs and immediate transactions from settings (default: on).',
+        )
+        parser.add_argument(
+            '--session-mode', choices=sorted(settings.SESSION_ENGINES), default=settings.SESSION_MODE,
+            help='Session storage to measure (default: SESSION_MODE).',
+        )
+        parser.add_argument(
+            '--user-cache', action=argparse.BooleanOptionalAction, default=settings.AUTH_USER_CACHE,
+            help='Cache the authenticated user between requests (default: AUTH_USER_CACHE).',
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        tmp_dir = None
+        sqlite_options = {}
+        if connection.vendor == 'sqlite' and not options['sqlite_tuning']:
+            # Baseline: deferred transactions, no PRAGMAs, the default 5 s timeout
+            sqlite_options = {'SQLITE_PRAGMAS': {}}
+            connection.settings_dict['OPTIONS'] = {}
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            # A file database behaves like production; in-memory SQLite does not
+            tmp_dir = tempfile.mkdtemp(prefix='loadtest-')
+            test_settings['NAME'] = options['db_file'] or os.path.join(tmp_dir, 'loadtest.sqlite3')
+        tuning = override_settings(**sqlite_options)
+        tuning.enable()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            backend = 'app.backends.CachedModelBackend' if options['user_cache'] else 'django.contrib.auth.backends.ModelBackend'
+            # Password hashing is deliberately slow and would dominate the login step
+            with override_settings(
+                PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+                SESSION_ENGINE=settings.SESSION_ENGINES[options['session_mode']],
+                AUTHENTICATION_BACKENDS=[backend],
+            ):
+                exam, students = self.seed(options)
+                if options['scenario'] == 'concurrent-submit':
+                    report = self.run_concurrent_submit(exam, students, options)
+                else:
+                    report = self.run(exam, students, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            tuning.disable()
+            teardown_test_environment()
+            if tmp_dir:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output)
+        self.stdout.write(output)
+
+    def seed(self, options):
+        teacher = CustomUser.objects.create_user('loadtest-teacher', password=PASSWORD, role='teacher')
+        exam = Exam.objects.create(
+            title='Load test exam', description='Load test', date=timezone.now(),
+            duration=60, created_by=teacher,
+        )
+        Question.objects.bulk_create(
+            Question(exam=exam, question_text=f'Question {i}', option1=f'A{i}', option2=f'B{i}',
+                     option3=f'C{i}', option4=f'D{i}', correct_option='option1')
+            for i in range(options['questions'])
+        )
+        students = [
+            CustomUser.objects.create_user(f'loadtest-student{i}', password=PASSWORD, role='student')
+            for i in range(options['students'])
+        ]
+        return exam, students
+
+    def request(self, client, name, method, url, data=None):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = getattr(client, method)(url, data or {})
+        elapsed = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.timings[name].append(elapsed)
+            self.queries[name] += counter.count
+            if response.status_code >= 400:
+                self.errors[name] += 1
+        return response
+
+    def reset(self):
+        self.timings = defaultdict(list)
+        self.queries = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def answers(self, questions, rng):
+        return {
+            f"question_{question.id}": getattr(question, rng.choice(['option1', 'option2', 'option3', 'option4']))
+            for question in questions
+        }
+
+    def run(self, exam, students, options):
+        self.reset()
+        lock, request = self.lock, self.request
+        pending = list(students)
+        workers = max(1, min(options['concurrency'], len(students)))
+        # Every worker waits here so the cohort starts at the same moment
+        start_line = threading.Barrier(workers)
+
+        def simulate(student, rng):
+            client = Client(raise_request_exception=False)
+
+            def think():
+                time.sleep(rng.uniform(0, options['think_time']))
+
+            request(client, 'login', 'post', reverse('login'), {'username': student.username, 'password': PASSWORD})
+            think()
+            request(client, 'exam_instructions', 'get', reverse('exam_instructions', args=[exam.id]))
+            think()
+            request(client, 'start_exam', 'get', reverse('start_exam', args=[exam.id]))
+            think()
+            request(client, 'submit', 'post', reverse('start_exam', args=[exam.id]), self.answers(questions, rng))
+            think()
+            request(client, 'student_result', 'get', reverse('student_result'))
+
+        def worker(index):
+            rng = random.Random(options['seed'] + index)
+            try:
+                start_line.wait()
+                while True:
+                    with lock:
+                        if not pending:
+                            return
+                        student = pending.pop()
+                    simulate(student, rng)
+            finally:
+                connection.close()
+
+        questions = list(exam.questions.all())
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - started
+        return self.report(options, workers, len(students), len(questions), duration)
+
+    def run_concurrent_submit(self, exam, students, options):
+        """Log every student in and open the exam, then submit all papers at once."""
+        self.reset()
+        questions = list(exam.questions.all())
+        clients = []
+        for index, student in enumerate(students):
+            client = Client(raise_request_exception=False)
+            self.request(client, 'login', 'post', reverse('login'), {'username': student.username, 'password': PASSWORD})
+            self.request(client, 'start_exam', 'get', reverse('start_exam', args=[exam.id]))
+            clients.append((client, random.Random(options['seed'] + index)))
+        # Only the submissions are reported
+        self.reset()
+
+        start_line = threading.Barrier(len(clients) + 1)
+
+        def submit(client, rng):
+            answers = self.answers(questions, rng)
+            try:
+                start_line.wait()
+                self.request(client, 'submit', 'post', reverse('start_exam', args=[exam.id]), answers)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=pair) for pair in clients]
+        for thread in threads:
+            thread.start()
+        start_line.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - started
+        return self.report(options, len(clients), len(students), len(questions), duration)
+
+    def report(self, options, workers, students, questions, duration):
+        timings, queries, errors = self.timings, self.queries, self.errors
+        endpoints = {}
+        for name, values in timings.items():
+            values.sort()
+            endpoints[name] = {
+                'requests': len(values),
+                'errors': errors[name],
+                'throughput_rps': round(len(values) / duration, 2),
+                'p50_ms': round(percentile(values, 50), 2),
+                'p95_ms': round(percentile(values, 95), 2),
+                'p99_ms': round(percentile(values, 99), 2),
+                'max_ms': round(values[-1], 2),
+                'queries': queries[name],
+                'queries_per_request': round(queries[name] / len(values), 2),
+            }
+        total_requests = sum(len(values) for values in timings.values())
+        return {
+            'config': {
+                'scenario': options['scenario'],
+                'students': students,
+                'concurrency': workers,
+                'questions': questions,
+                'think_time': options['think_time'],
+                'database': connection.vendor,
+                'submission_mode': settings.EXAM_SUBMISSION_MODE,
+                'session_mode': options['session_mode'],
+                'user_cache': options['user_cache'],
+                'sqlite_tuning': options['sqlite_tuning'] if connection.vendor == 'sqlite' else None,
+            },
+            'duration_s': round(duration, 2),
+            'requests': total_requests,
+            'throughput_rps': round(total_requests / duration, 2),
+            'queries': sum(queries.values()),
+            'endpoints': endpoints,
+        }
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from app import running_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute ExamStats and QuestionStats from the graded results."
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_ids', nargs='*', type=int, help='Exams to rebuild (default: all).')
+
+    def handle(self, *args, **options):
+        running_stats.rebuild(options['exam_ids'] or None)
+        self.stdout.write("Rebuilt exam statistics.")
@@ -0,0 +1,55 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from app import job_worker, jobs
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the Job table and enqueue due scheduled jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Worker processes running jobs.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when no job is due.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when no job is due.')
+        parser.add_argument('--stale-after', type=int, default=3600, help='Seconds before a running job is requeued.')
+
+    def handle(self, *args, **options):
+        requeued = jobs.requeue_stale(timedelta(seconds=options['stale_after']))
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s).")
+
+        counts = {'done': 0, 'pending': 0, 'failed': 0}
+        running = {}
+        # Jobs run in fresh interpreters so they never share the parent's connection
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(options['processes'], mp_context=context, initializer=job_worker.init) as pool:
+            while True:
+                jobs.schedule_due()
+                for job_id in jobs.claim(options['processes'] - len(running)):
+                    running[pool.submit(job_worker.run, job_id)] = job_id
+
+                if not running:
+                    if not options['loop']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                finished, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job_id = running.pop(future)
+                    try:
+                        status = future.result()
+                    except Exception as exc:
+                        # The worker process itself died; requeue_stale picks the job up again
+                        self.stderr.write(f"Job {job_id} crashed its worker: {exc}")
+                        continue
+                    counts[status] += 1
+                    self.stdout.write(f"Job {job_id}: {status}.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {counts['done']} succeeded, {counts['pending']} to retry, {counts['failed']} failed."
+        ))
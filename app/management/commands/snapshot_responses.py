@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import Exam
+from app.snapshots import write_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Write StudentResponse rows to a directory of memory-mappable .npy "
+        "columns for offline analysis (load them with app.snapshots.load_snapshot)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Output directory.')
+        parser.add_argument('--exam', type=int, action='append', dest='exams', help='Exam id to include (repeatable).')
+        parser.add_argument('--from-exam', type=int, help='Lowest exam id to include.')
+        parser.add_argument('--to-exam', type=int, help='Highest exam id to include.')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Rows fetched per database round trip.')
+
+    def handle(self, *args, **options):
+        exam_ids = None
+        if options['exams'] or options['from_exam'] is not None or options['to_exam'] is not None:
+            exams = Exam.objects.all()
+            if options['exams']:
+                exams = exams.filter(id__in=options['exams'])
+            if options['from_exam'] is not None:
+                exams = exams.filter(id__gte=options['from_exam'])
+            if options['to_exam'] is not None:
+                exams = exams.filter(id__lte=options['to_exam'])
+            exam_ids = list(exams.values_list('id', flat=True))
+            if not exam_ids:
+                raise CommandError("No exams match the given range.")
+
+        rows = write_snapshot(options['directory'], exam_ids, options['chunk_size'])
+        self.stdout.write(f"Wrote {rows} responses to {options['directory']}.")
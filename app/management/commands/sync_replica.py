@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def copy_database(source, target):
+    """
+    Copy the SQLite database `source` to `target` with the online backup API.
+    The copy is written next to the target and renamed over it, so readers
+    see either the old or the new file, never a partial one.
+    """
+    partial = f"{target}.partial"
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(partial)
+    try:
+        src.backup(dst)
+        # Readers open the replica read-only, which rules out WAL
+        dst.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        dst.close()
+        src.close()
+    os.replace(partial, target)
+
+
+class Command(BaseCommand):
+    help = "Refresh the SQLite read replica (DB_REPLICA_NAME) from the primary database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', help='Primary database file (default: the default database).')
+        parser.add_argument('--target', help='Replica file (default: DB_REPLICA_NAME).')
+        parser.add_argument('--loop', action='store_true', help='Keep copying instead of exiting after one copy.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between copies with --loop.')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        if not source:
+            if connections['default'].vendor != 'sqlite':
+                raise CommandError("sync_replica copies SQLite files; use the server's replication for other databases.")
+            source = str(settings.DATABASES['default']['NAME'])
+        target = options['target'] or getattr(settings, 'DB_REPLICA_NAME', '')
+        if not target:
+            raise CommandError("No replica file: set DB_REPLICA_NAME or pass --target.")
+
+        while True:
+            started = time.perf_counter()
+            copy_database(source, target)
+            self.stdout.write(f"Copied {source} to {target} in {(time.perf_counter() - started) * 1000:.0f} ms.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, Sum
+
+
+def backfill_exam_results(apps, schema_editor):
+    Exam = apps.get_model('app', 'Exam')
+    ExamResult = apps.get_model('app', 'ExamResult')
+    StudentResponse = apps.get_model('app', 'StudentResponse')
+
+    max_scores = dict(Exam.objects.annotate(total=Sum('questions__marks')).values_list('id', 'total'))
+    passing_marks = dict(Exam.objects.values_list('id', 'passing_marks'))
+    rows = (
+        StudentResponse.objects
+        .values('student_id', 'exam_id')
+        .annotate(submitted_at=Max('timestamp'))
+    )
+    scores = {
+        (row['student_id'], row['exam_id']): row['score']
+        for row in StudentResponse.objects
+        .filter(is_correct=True)
+        .values('student_id', 'exam_id')
+        .annotate(score=Sum('question__marks'))
+    }
+
+    results = []
+    for row in rows:
+        score = scores.get((row['student_id'], row['exam_id'])) or 0
+        max_score = max_scores.get(row['exam_id']) or 0
+        percentage = round((score / max_score) * 100, 2) if max_score > 0 else 0
+        grade = next((g for limit, g in ((90, 'A+'), (80, 'A'), (70, 'B'), (60, 'C'), (50, 'D')) if percentage >= limit), 'F')
+        results.append(ExamResult(
+            student_id=row['student_id'],
+            exam_id=row['exam_id'],
+            score=score,
+            max_score=max_score,
+            percentage=percentage,
+            grade=grade,
+            passed=score >= passing_marks[row['exam_id']],
+            submitted_at=row['submitted_at'],
+        ))
+    ExamResult.objects.bulk_create(results, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_pendingsubmission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt', models.IntegerField(default=1)),
+                ('score', models.IntegerField(default=0)),
+                ('max_score', models.IntegerField(default=0)),
+                ('percentage', models.FloatField(default=0)),
+                ('grade', models.CharField(max_length=2)),
+                ('passed', models.BooleanField(default=False)),
+                ('submitted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.exam')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('student', 'exam')},
+            },
+        ),
+        migrations.RunPython(backfill_exam_results, migrations.RunPython.noop),
+    ]
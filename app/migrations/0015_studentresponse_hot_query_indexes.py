@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_examresult'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentresponse',
+            index=models.Index(fields=['exam', 'student'], name='response_exam_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentresponse',
+            index=models.Index(fields=['question', 'is_correct'], name='response_question_correct_idx'),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+
+
+def backfill_stats(apps, schema_editor):
+    ExamResult = apps.get_model('app', 'ExamResult')
+    ExamStats = apps.get_model('app', 'ExamStats')
+    QuestionStats = apps.get_model('app', 'QuestionStats')
+    StudentResponse = apps.get_model('app', 'StudentResponse')
+
+    exam_rows = (
+        ExamResult.objects
+        .values('exam_id')
+        .annotate(
+            attempts=Count('id'),
+            passes=Count('id', filter=Q(passed=True)),
+            score_sum=Sum('score'),
+            score_sq_sum=Sum(F('score') * F('score')),
+        )
+    )
+    ExamStats.objects.bulk_create([
+        ExamStats(
+            exam_id=row['exam_id'],
+            attempt_count=row['attempts'],
+            pass_count=row['passes'],
+            score_sum=row['score_sum'] or 0,
+            score_sq_sum=row['score_sq_sum'] or 0,
+        )
+        for row in exam_rows
+    ], batch_size=500)
+
+    # Only responses of graded attempts count
+    question_rows = (
+        StudentResponse.objects
+        .filter(
+            student__examresult__exam_id=F('exam_id'),
+            timestamp__lte=F('student__examresult__submitted_at'),
+        )
+        .values('question_id', 'exam_id')
+        .annotate(attempts=Count('id'), correct=Count('id', filter=Q(is_correct=True)))
+    )
+    QuestionStats.objects.bulk_create([
+        QuestionStats(
+            question_id=row['question_id'],
+            exam_id=row['exam_id'],
+            attempt_count=row['attempts'],
+            correct_count=row['correct'],
+        )
+        for row in question_rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_studentresponse_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.IntegerField(default=0)),
+                ('pass_count', models.IntegerField(default=0)),
+                ('score_sum', models.BigIntegerField(default=0)),
+                ('score_sq_sum', models.BigIntegerField(default=0)),
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='app.exam')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.IntegerField(default=0)),
+                ('correct_count', models.IntegerField(default=0)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_stats', to='app.exam')),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='app.question')),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_exam_question_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examresult',
+            index=models.Index(fields=['exam', '-score'], name='result_exam_score_idx'),
+        ),
+    ]
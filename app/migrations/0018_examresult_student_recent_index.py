@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_examresult_exam_score_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examresult',
+            index=models.Index(fields=['student', '-submitted_at'], name='result_student_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:00
+
+import app.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_job_scheduledjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='answer_key_revision',
+            field=models.BigIntegerField(default=app.models.new_answer_key_revision, editable=False),
+        ),
+    ]
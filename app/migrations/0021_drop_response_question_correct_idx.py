@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:32
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0020_exam_answer_key_revision'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='studentresponse',
+            name='response_question_correct_idx',
+        ),
+    ]
@@ -1,3 +1,5 @@
+import time
+
 from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
@@ -20,6 +22,11 @@ class CustomUser(AbstractUser):
         return self.username
 
 
+def new_answer_key_revision():
+    # Milliseconds, so an exam that reuses a deleted exam's id starts past its revisions
+    return int(time.time() * 1000)
+
+
 class Exam(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField() 
@@ -28,6 +35,8 @@ class Exam(models.Model):
     marks_per_question = models.IntegerField(default=5)
     passing_marks = models.IntegerField(default=22)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='exams', null=True, blank=True)
+    # Bumped whenever a question changes; grading keys the compiled answer key on it
+    answer_key_revision = models.BigIntegerField(default=new_answer_key_revision, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -78,11 +87,84 @@ class StudentResponse(models.Model):
 
     class Meta:
         unique_together = ('student', 'exam', 'question')
+        # (student, exam) lookups use the unique_together index prefix
+        indexes = [
+            models.Index(fields=['exam', 'student'], name='response_exam_student_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.exam.title} - Q{self.question.id}"
 
 
+class ExamResult(models.Model):
+    """Summary of a student's latest graded attempt, written with the responses."""
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
+    attempt = models.IntegerField(default=1)
+    score = models.IntegerField(default=0)
+    max_score = models.IntegerField(default=0)
+    percentage = models.FloatField(default=0)
+    grade = models.CharField(max_length=2)
+    passed = models.BooleanField(default=False)
+    submitted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('student', 'exam')
+        indexes = [
+            # Rank index rebuilds and leaderboards
+            models.Index(fields=['exam', '-score'], name='result_exam_score_idx'),
+            # Latest attempts of a student (dashboard, result page)
+            models.Index(fields=['student', '-submitted_at'], name='result_student_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.exam.title} ({self.score}/{self.max_score})"
+
+
+class ExamStats(models.Model):
+    """
+    Running totals over every graded attempt of an exam. Plain integer sums
+    (instead of a floating point Welford mean) so a reattempt can subtract
+    the attempt it replaces exactly.
+    """
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, related_name='stats')
+    attempt_count = models.IntegerField(default=0)
+    pass_count = models.IntegerField(default=0)
+    score_sum = models.BigIntegerField(default=0)
+    score_sq_sum = models.BigIntegerField(default=0)
+
+    @property
+    def mean(self):
+        return self.score_sum / self.attempt_count if self.attempt_count else 0
+
+    @property
+    def variance(self):
+        if not self.attempt_count:
+            return 0
+        return max(0, self.score_sq_sum / self.attempt_count - self.mean ** 2)
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    def __str__(self):
+        return f"{self.exam.title} - {self.attempt_count} attempts"
+
+
+class QuestionStats(models.Model):
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='stats')
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='question_stats')
+    attempt_count = models.IntegerField(default=0)
+    correct_count = models.IntegerField(default=0)
+
+    @property
+    def difficulty(self):
+        return self.correct_count / self.attempt_count if self.attempt_count else 0
+
+    def __str__(self):
+        return f"Q{self.question_id} - {self.correct_count}/{self.attempt_count}"
+
+
 class ExamAssignment(models.Model):
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -122,3 +204,93 @@ class Feedback(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.subject}"
+
+
+class PendingSubmission(models.Model):
+    """Spooled exam submission waiting for `manage.py grade_submissions`."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
+    answers = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    submitted_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    graded_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['student', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.exam.title} ({self.status})"
+
+
+class Job(models.Model):
+    """A unit of background work run by `manage.py runjobs` (see app/jobs.py)."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=dict, blank=True)
+    # Identifies what the job computes, e.g. "exam_analytics:12"; used to skip
+    # duplicate refreshes and to find the latest result
+    key = models.CharField(max_length=200, blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    duration_ms = models.FloatField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+            models.Index(fields=['key', 'status', '-finished_at'], name='job_key_latest_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+
+
+class ScheduledJob(models.Model):
+    """Enqueues a Job for `task` whenever the cron expression is due."""
+    name = models.CharField(max_length=100, unique=True)
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=dict, blank=True)
+    cron = models.CharField(max_length=100, help_text='minute hour day-of-month month day-of-week, e.g. "0 3 * * *"')
+    enabled = models.BooleanField(default=True)
+    next_run_at = models.DateTimeField(blank=True, null=True)
+    last_enqueued_at = models.DateTimeField(blank=True, null=True)
+
+    def clean(self):
+        super().clean()
+        from app.cron import Cron
+        try:
+            Cron(self.cron)
+        except ValueError as exc:
+            raise ValidationError({'cron': str(exc)})
+
+    def save(self, *args, **kwargs):
+        # A changed expression is rescheduled by the next runjobs pass
+        if self.pk and ScheduledJob.objects.filter(pk=self.pk).exclude(cron=self.cron).exists():
+            self.next_run_at = None
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.name} ({self.cron})"
@@ -0,0 +1,93 @@
+from bisect import bisect_left, bisect_right, insort
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from app.models import ExamResult, ExamStats
+
+# Per-exam rank index: the sorted scores of every graded student, kept in the
+# cache. Grading moves the student's score in it after the transaction
+# commits; rank and percentile are then two bisections. A missing index is
+# rebuilt from the (exam, -score) index on ExamResult.
+#
+# Readers check the index against the exam's ExamStats totals (count, sum
+# and sum of squares of the scores) in the database and rebuild it when they
+# differ, so an index updated in another process's cache, or built just
+# before a submission committed, is never served.
+
+INDEX_TIMEOUT = getattr(settings, 'RANK_INDEX_TIMEOUT', 60 * 60)
+LOCK_TIMEOUT = 5
+
+
+def _index_key(exam_id):
+    return f"rank_index:{exam_id}"
+
+
+def _matches_totals(scores, exam_id):
+    totals = ExamStats.objects.using(DEFAULT_DB_ALIAS).filter(exam_id=exam_id).values_list(
+        'attempt_count', 'score_sum', 'score_sq_sum',
+    ).first() or (0, 0, 0)
+    return tuple(totals) == (len(scores), sum(scores), sum(score * score for score in scores))
+
+
+def score_index(exam_id):
+    """Sorted (ascending) scores of every graded student of the exam."""
+    scores = cache.get(_index_key(exam_id))
+    if scores is None or not _matches_totals(scores, exam_id):
+        # Always from the primary: grading updates the index incrementally, so
+        # one built from a lagging replica would stay wrong
+        scores = list(
+            ExamResult.objects
+            .using(DEFAULT_DB_ALIAS)
+            .filter(exam_id=exam_id)
+            .order_by('score')
+            .values_list('score', flat=True)
+        )
+        cache.set(_index_key(exam_id), scores, INDEX_TIMEOUT)
+    return scores
+
+
+def record_score(exam_id, score, previous_score=None):
+    """Move a student's score in the index; call after the result is committed."""
+    key = _index_key(exam_id)
+    if not cache.add(f"{key}:lock", True, LOCK_TIMEOUT):
+        # Another submission is updating it: drop the index, the next read rebuilds it
+        cache.delete(key)
+        return
+    try:
+        scores = cache.get(key)
+        if scores is None:
+            return
+        if previous_score is not None:
+            position = bisect_left(scores, previous_score)
+            if position < len(scores) and scores[position] == previous_score:
+                del scores[position]
+        insort(scores, score)
+        cache.set(key, scores, INDEX_TIMEOUT)
+    finally:
+        cache.delete(f"{key}:lock")
+
+
+def rank(exam_id, score):
+    """
+    Return (rank, out_of, percentile) for a score. Equal scores share a rank;
+    the percentile counts students below plus half of those level with it.
+    """
+    scores = score_index(exam_id)
+    if not scores:
+        return None, 0, None
+    below = bisect_left(scores, score)
+    at_or_below = bisect_right(scores, score)
+    percentile = (below + (at_or_below - below) / 2) / len(scores) * 100
+    return len(scores) - at_or_below + 1, len(scores), round(percentile, 1)
+
+
+def leaderboard(exam_id, limit=10):
+    """Top results of an exam, read from the (exam, -score) index."""
+    return list(
+        ExamResult.objects
+        .filter(exam_id=exam_id)
+        .select_related('student')
+        .order_by('-score', 'submitted_at', 'id')[:limit]
+    )
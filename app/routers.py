@@ -0,0 +1,112 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Read replica routing. ReplicaRoutingMiddleware marks requests to the views
+# in REPLICA_VIEWS (and admin change lists); while they run, reads of the
+# models in REPLICA_MODELS go to the replica. A request that writes to the
+# primary switches back to it and pins the client there for
+# REPLICA_PIN_SECONDS with a cookie, so the writer never reads a replica that
+# has not caught up.
+
+PIN_COOKIE = 'pin_primary'
+
+_request_state = ContextVar('replica_routing', default=None)
+
+
+def replica_database():
+    """
+    The alias replica reads go to, or None. A replica that is really the
+    primary, as the test runner's mirror is, is ignored so reads keep using
+    the primary connection and see the test's own transaction.
+    """
+    alias = settings.REPLICA_DATABASE
+    if alias and alias != DEFAULT_DB_ALIAS:
+        replica, primary = connections[alias].settings_dict, connections[DEFAULT_DB_ALIAS].settings_dict
+        if all(replica[key] == primary[key] for key in ('NAME', 'HOST', 'PORT')):
+            return None
+    return alias
+
+
+def reading_from_replica():
+    state = _request_state.get()
+    return bool(state and state['replica'])
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if reading_from_replica() and model._meta.label_lower in settings.REPLICA_MODELS:
+            return settings.REPLICA_DATABASE
+        # Explicit, so objects loaded from the replica never steer later reads there
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def _routed(content, state):
+    # Streaming bodies are generated after the middleware returns
+    iterator = iter(content)
+    while True:
+        token = _request_state.set(state)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _request_state.reset(token)
+        yield chunk
+
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class _WriteWatcher:
+    # db_for_write is also consulted for unsaved objects, so writes are
+    # detected from the statements actually sent to the primary
+    def __init__(self, state):
+        self.state = state
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            self.state['replica'] = False
+            self.state['wrote'] = True
+        return execute(sql, params, many, context)
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {'replica': False, 'wrote': False}
+        token = _request_state.set(state)
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(_WriteWatcher(state)):
+                response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if response.streaming and state['replica']:
+            response.streaming_content = _routed(response.streaming_content, state)
+        if state['wrote']:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not replica_database() or PIN_COOKIE in request.COOKIES:
+            return None
+        match = request.resolver_match
+        if match.view_name in settings.REPLICA_VIEWS or (
+            match.namespace == 'admin' and (match.url_name or '').endswith('_changelist')
+        ):
+            _request_state.get()['replica'] = True
+        return None
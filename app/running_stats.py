@@ -0,0 +1,136 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+
+from app.models import ExamResult, ExamStats, QuestionStats, StudentResponse
+
+# ExamStats and QuestionStats are kept current by grade_submission: every
+# graded attempt adds its score and per-question outcomes, and a reattempt
+# first subtracts the attempt it replaces. Readers get counts, mean and
+# spread without scanning StudentResponse.
+
+
+def record_attempt(exam_id, score, passed, outcomes, previous=None, previous_outcomes=()):
+    """
+    Apply one graded attempt to the running totals.
+
+    `outcomes` and `previous_outcomes` are (question_id, is_correct) pairs;
+    `previous` is the (score, passed) of the attempt being replaced, if any.
+    Runs inside the caller's transaction.
+    """
+    attempts, passes, score_sum, score_sq_sum = 1, int(passed), score, score * score
+    if previous is not None:
+        previous_score, previous_passed = previous
+        attempts -= 1
+        passes -= int(previous_passed)
+        score_sum -= previous_score
+        score_sq_sum -= previous_score * previous_score
+
+    question_deltas = defaultdict(lambda: [0, 0])
+    for question_id, is_correct in outcomes:
+        question_deltas[question_id][0] += 1
+        question_deltas[question_id][1] += int(is_correct)
+    for question_id, is_correct in previous_outcomes:
+        question_deltas[question_id][0] -= 1
+        question_deltas[question_id][1] -= int(is_correct)
+    _apply(exam_id, attempts, passes, score_sum, score_sq_sum, question_deltas)
+
+
+def remove_attempt(result):
+    """
+    Take a graded attempt that is being deleted out of the running totals.
+    Call before the ExamResult and its responses are deleted.
+    """
+    outcomes = (
+        StudentResponse.objects
+        .filter(student_id=result.student_id, exam_id=result.exam_id, timestamp__lte=result.submitted_at)
+        .values_list('question_id', 'is_correct')
+    )
+    question_deltas = defaultdict(lambda: [0, 0])
+    for question_id, is_correct in outcomes:
+        question_deltas[question_id][0] -= 1
+        question_deltas[question_id][1] -= int(is_correct)
+    _apply(result.exam_id, -1, -int(result.passed), -result.score, -result.score * result.score, question_deltas)
+
+
+def _apply(exam_id, attempts, passes, score_sum, score_sq_sum, question_deltas):
+    deltas = {
+        'attempt_count': F('attempt_count') + attempts,
+        'pass_count': F('pass_count') + passes,
+        'score_sum': F('score_sum') + score_sum,
+        'score_sq_sum': F('score_sq_sum') + score_sq_sum,
+    }
+    if not ExamStats.objects.filter(exam_id=exam_id).update(**deltas):
+        ExamStats.objects.bulk_create([ExamStats(exam_id=exam_id)], ignore_conflicts=True)
+        ExamStats.objects.filter(exam_id=exam_id).update(**deltas)
+
+    question_deltas = {question_id: delta for question_id, delta in question_deltas.items() if any(delta)}
+    if not question_deltas:
+        return
+
+    # Rows are created on first use; existing ones are left untouched
+    QuestionStats.objects.bulk_create(
+        [QuestionStats(question_id=question_id, exam_id=exam_id) for question_id in question_deltas
+         if question_deltas[question_id][0] > 0],
+        ignore_conflicts=True,
+    )
+    # One UPDATE for every question, grouped by the size of the change
+    QuestionStats.objects.filter(question_id__in=question_deltas).update(
+        attempt_count=F('attempt_count') + _delta_case(question_deltas, 0),
+        correct_count=F('correct_count') + _delta_case(question_deltas, 1),
+    )
+
+
+def _delta_case(question_deltas, index):
+    groups = defaultdict(list)
+    for question_id, delta in question_deltas.items():
+        if delta[index]:
+            groups[delta[index]].append(question_id)
+    return Case(
+        *[When(question_id__in=ids, then=Value(delta)) for delta, ids in groups.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def rebuild(exam_ids=None):
+    """
+    Recompute the running totals from ExamResult and the graded responses,
+    for data loaded without going through grade_submission.
+    """
+    results = ExamResult.objects.all()
+    responses = StudentResponse.objects.filter(
+        student__examresult__exam_id=F('exam_id'),
+        timestamp__lte=F('student__examresult__submitted_at'),
+    )
+    if exam_ids is not None:
+        results = results.filter(exam_id__in=exam_ids)
+        responses = responses.filter(exam_id__in=exam_ids)
+
+    exam_rows = results.values('exam_id').annotate(
+        attempts=Count('id'),
+        passes=Count('id', filter=Q(passed=True)),
+        total=Sum('score'),
+        total_sq=Sum(F('score') * F('score')),
+    )
+    question_rows = responses.values('question_id', 'exam_id').annotate(
+        attempts=Count('id'),
+        correct=Count('id', filter=Q(is_correct=True)),
+    )
+    with transaction.atomic():
+        for model in (ExamStats, QuestionStats):
+            stale = model.objects.all()
+            if exam_ids is not None:
+                stale = stale.filter(exam_id__in=exam_ids)
+            stale.delete()
+        ExamStats.objects.bulk_create([
+            ExamStats(exam_id=row['exam_id'], attempt_count=row['attempts'], pass_count=row['passes'],
+                      score_sum=row['total'] or 0, score_sq_sum=row['total_sq'] or 0)
+            for row in exam_rows
+        ], batch_size=500)
+        QuestionStats.objects.bulk_create([
+            QuestionStats(question_id=row['question_id'], exam_id=row['exam_id'],
+                          attempt_count=row['attempts'], correct_count=row['correct'])
+            for row in question_rows
+        ], batch_size=500)
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from app.caching import bump_catalog_version, bump_exam_version, bump_teacher_version, bump_user_version
+from app import running_stats
+from app.models import CustomUser, Exam, ExamResult, Question
+
+
+# Cached exam data (answer keys, ...) is keyed on the exam version, so any
+# change to an exam or one of its questions simply bumps that version.
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    bump_exam_version(instance.exam_id)
+    # Grading keys answer keys on the database revision, which every process sees
+    Exam.objects.filter(pk=instance.exam_id).update(answer_key_revision=F('answer_key_revision') + 1)
+
+
+@receiver([post_save, post_delete], sender=Exam)
+def exam_changed(sender, instance, **kwargs):
+    bump_exam_version(instance.pk)
+    bump_catalog_version()
+    # The teacher dashboard lists and counts the teacher's exams
+    if instance.created_by_id:
+        bump_teacher_version(instance.created_by_id)
+
+
+@receiver(pre_delete, sender=ExamResult)
+def result_deleted(sender, instance, origin=None, **kwargs):
+    # Deleting the exam takes its running totals with it. Otherwise the
+    # attempt is subtracted here, while its graded responses still exist:
+    # a cascade from the student may delete them before post_delete runs.
+    if isinstance(origin, Exam) or getattr(origin, 'model', None) is Exam:
+        return
+    running_stats.remove_attempt(instance)
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    # Drops the copy CachedModelBackend keeps for authenticated requests
+    bump_user_version(instance.pk)
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    if connection.alias != DEFAULT_DB_ALIAS:
+        # The replica is a read-only copy that keeps its rollback journal
+        pragmas.pop('journal_mode', None)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,121 @@
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from app.analytics import load_response_matrix
+from app.caching import exam_version, report_timeout, results_version
+from app.grading import get_answer_key, option_lookup
+
+# Pairs of students who picked the same wrong option on unusually many
+# questions. Each student's answers are packed into one bitset per option;
+# agreement between two students is the popcount of the AND of their bitsets,
+# computed for a block of students against everyone at once.
+
+MIN_SHARED_WRONG = getattr(settings, 'SIMILARITY_MIN_SHARED_WRONG', 3)
+Z_THRESHOLD = getattr(settings, 'SIMILARITY_Z_THRESHOLD', 3.0)
+REPORT_LIMIT = getattr(settings, 'SIMILARITY_REPORT_LIMIT', 50)
+CACHE_TIMEOUT = getattr(settings, 'SIMILARITY_CACHE_TIMEOUT', 24 * 60 * 60)
+# Upper bound for the shared-answer counts of one block
+BLOCK_BYTES = 64 * 1024 * 1024
+N_OPTIONS = 4
+
+
+def pack_rows(mask):
+    """Pack a students x questions boolean matrix into rows of uint64 words."""
+    packed = np.packbits(mask, axis=1)
+    padding = (-packed.shape[1]) % 8
+    if padding:
+        packed = np.pad(packed, ((0, 0), (0, padding)))
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+def find_similar_pairs(options, correct_options, min_shared_wrong=MIN_SHARED_WRONG,
+                       z_threshold=Z_THRESHOLD, limit=REPORT_LIMIT):
+    """
+    Return (pairs, stats, wrong_counts) for a students x questions matrix of
+    selected option indexes (-1 for none) and the correct option index of each
+    question.
+
+    `pairs` are (i, j, shared_answers, shared_wrong, z) for student rows i < j
+    whose shared wrong answers are at least `min_shared_wrong` and `z_threshold`
+    standard deviations above the mean over all pairs, highest first.
+    `wrong_counts` is the number of wrong answers of each student row.
+    """
+    n_students = options.shape[0]
+    choices = np.arange(N_OPTIONS)[:, None, None]
+    chosen = options[None, :, :] == choices                      # option x student x question
+    wrong = chosen & (choices != np.asarray(correct_options)[None, None, :])
+    # The option bitsets of a student side by side: an AND + popcount over
+    # the words counts agreement on every option at once. Stored word-major
+    # so each word is a contiguous column over all students.
+    answers = np.hstack([pack_rows(m) for m in chosen])
+    wrong_words = np.ascontiguousarray(np.hstack([pack_rows(m) for m in wrong]).T)
+    wrong_counts = wrong.sum(axis=(0, 2))
+
+    block = max(1, BLOCK_BYTES // (max(1, n_students) * 8))
+    total_pairs = n_students * (n_students - 1) // 2
+    # histogram[v]: number of pairs sharing v wrong answers
+    histogram = np.zeros(options.shape[1] + 1, dtype=np.int64)
+    candidates = []
+
+    for start in range(0, n_students, block):
+        end = min(start + block, n_students)
+        # Compare the block with itself and every later student only
+        shared_wrong = np.zeros((end - start, n_students - start), dtype=np.int32)
+        for word in wrong_words:
+            shared_wrong += np.bitwise_count(word[start:end, None] & word[None, start:])
+        upper = np.arange(n_students - start)[None, :] > np.arange(end - start)[:, None]
+        shared_wrong[~upper] = -1
+        histogram += np.bincount((shared_wrong + 1).ravel(), minlength=len(histogram) + 1)[1:]
+
+        # Only the block's top `limit` can make the overall top `limit`
+        flat = shared_wrong.ravel()
+        top = np.argpartition(flat, -limit)[-limit:] if len(flat) > limit else np.arange(len(flat))
+        top = top[flat[top] >= min_shared_wrong]
+        if not len(top):
+            continue
+        block_rows, block_cols = np.unravel_index(top, shared_wrong.shape)
+        i, j = block_rows + start, block_cols + start
+        shared = np.bitwise_count(answers[i] & answers[j]).sum(axis=1, dtype=np.int64)
+        candidates.extend(zip(i.tolist(), j.tolist(), shared.tolist(), flat[top].tolist()))
+
+    values = np.arange(len(histogram))
+    mean = float((histogram * values).sum() / total_pairs) if total_pairs else 0.0
+    std = float(max(0.0, (histogram * values * values).sum() / total_pairs - mean * mean) ** 0.5) if total_pairs else 0.0
+    pairs = []
+    for i, j, shared, shared_wrong in candidates:
+        z = (shared_wrong - mean) / std if std else float('inf')
+        if z >= z_threshold:
+            pairs.append((i, j, shared, shared_wrong, z))
+    pairs.sort(key=lambda pair: (-pair[3], -pair[2], pair[0], pair[1]))
+
+    stats = {'students': n_students, 'pairs': total_pairs, 'mean_shared_wrong': mean, 'std_shared_wrong': std}
+    return pairs[:limit], stats, wrong_counts
+
+
+def similarity_report(exam_id):
+    """Flagged pairs of an exam, cached until its questions or results change."""
+    key = f"similarity:{exam_id}:{exam_version(exam_id)}:{results_version(exam_id)}"
+    report = cache.get(key)
+    if report is not None:
+        return report
+
+    answer_key = get_answer_key(exam_id)
+    student_ids, usernames, correct, _, options = load_response_matrix(exam_id, answer_key, with_options=True)
+    lookup = option_lookup(answer_key)
+    correct_options = [lookup[q].get(answer_key.correct[q], -1) for q in answer_key.question_ids]
+    pairs, stats, wrong_counts = find_similar_pairs(options, correct_options)
+    scores = correct.sum(axis=1)
+
+    report = dict(stats, flagged=[
+        {
+            'student_a': usernames[i], 'student_b': usernames[j],
+            'score_a': int(scores[i]), 'score_b': int(scores[j]),
+            'wrong_a': int(wrong_counts[i]), 'wrong_b': int(wrong_counts[j]),
+            'shared_answers': shared, 'shared_wrong': shared_wrong,
+            'z': round(z, 2) if z != float('inf') else None,
+        }
+        for i, j, shared, shared_wrong, z in pairs
+    ])
+    cache.set(key, report, report_timeout(CACHE_TIMEOUT))
+    return report
@@ -0,0 +1,125 @@
+import json
+import os
+from dataclasses import dataclass
+from itertools import islice
+
+import numpy as np
+from django.db.models import Max
+from django.utils import timezone
+
+from app.grading import get_answer_key, normalize, option_lookup
+from app.models import StudentResponse
+
+# A response snapshot is a directory of .npy files, one per column, sorted by
+# exam, student and question, plus meta.json. Loading memory-maps the columns
+# so large snapshots can be sliced without reading them into RAM.
+
+COLUMNS = {
+    'exam_id': np.int64,
+    'student_id': np.int64,
+    'question_id': np.int64,
+    'option': np.int8,        # 0-3 for option1-option4, -1 when unanswered or unknown
+    'is_correct': np.bool_,
+    'timestamp': np.int64,    # Unix time in milliseconds
+}
+META_FILE = 'meta.json'
+
+
+def write_snapshot(directory, exam_ids=None, chunk_size=10000):
+    """
+    Dump StudentResponse rows (optionally only `exam_ids`) into `directory`.
+
+    The columns are written through memory-mapped arrays while the rows are
+    streamed from the database, so memory use does not grow with the export.
+    Returns the number of rows written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    responses = StudentResponse.objects.all()
+    if exam_ids is not None:
+        responses = responses.filter(exam_id__in=exam_ids)
+
+    # No transaction: with SQLite's IMMEDIATE mode it would hold the write lock
+    # for the whole dump. Rows inserted after the count are left out by the id
+    # bound and the slice; rows deleted meanwhile leave the end of the arrays
+    # unused.
+    last_id = responses.aggregate(last_id=Max('id'))['last_id'] or 0
+    responses = responses.filter(id__lte=last_id)
+    total = responses.count()
+    arrays = {
+        name: np.lib.format.open_memmap(os.path.join(directory, f'{name}.npy'), mode='w+', dtype=dtype, shape=(total,))
+        for name, dtype in COLUMNS.items()
+    }
+    rows = (
+        responses
+        .order_by('exam_id', 'student_id', 'question_id')
+        .values_list('exam_id', 'student_id', 'question_id', 'selected_option', 'is_correct', 'timestamp')
+        .iterator(chunk_size=chunk_size)
+    )
+    option_indexes = {}
+    position = 0
+    chunk = []
+    for row in islice(rows, total):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            position = _write_chunk(arrays, position, chunk, option_indexes)
+            chunk = []
+    position = _write_chunk(arrays, position, chunk, option_indexes)
+
+    for array in arrays.values():
+        array.flush()
+    with open(os.path.join(directory, META_FILE), 'w') as fh:
+        json.dump({
+            'rows': position,
+            'exam_ids': sorted(option_indexes),
+            'columns': list(COLUMNS),
+            'created_at': timezone.now().isoformat(),
+        }, fh, indent=2)
+    return position
+
+
+def _write_chunk(arrays, position, chunk, option_indexes):
+    if not chunk:
+        return position
+    exam_col, student_col, question_col, selected_col, correct_col, timestamp_col = zip(*chunk)
+    options = []
+    for exam_id, question_id, selected in zip(exam_col, question_col, selected_col):
+        if exam_id not in option_indexes:
+            option_indexes[exam_id] = option_lookup(get_answer_key(exam_id))
+        options.append(option_indexes[exam_id].get(question_id, {}).get(normalize(selected), -1))
+
+    end = position + len(chunk)
+    arrays['exam_id'][position:end] = exam_col
+    arrays['student_id'][position:end] = student_col
+    arrays['question_id'][position:end] = question_col
+    arrays['option'][position:end] = options
+    arrays['is_correct'][position:end] = correct_col
+    arrays['timestamp'][position:end] = [int(ts.timestamp() * 1000) for ts in timestamp_col]
+    return end
+
+
+@dataclass
+class ResponseSnapshot:
+    meta: dict
+    columns: dict
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def exam(self, exam_id):
+        """The columns of one exam, as views into the memory map."""
+        exam_col = self.columns['exam_id']
+        start, end = np.searchsorted(exam_col, [exam_id, exam_id + 1])
+        return {name: column[start:end] for name, column in self.columns.items()}
+
+
+def load_snapshot(directory):
+    with open(os.path.join(directory, META_FILE)) as fh:
+        meta = json.load(fh)
+    columns = {
+        name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')[:meta['rows']]
+        for name in meta['columns']
+    }
+    return ResponseSnapshot(meta=meta, columns=columns)
@@ -0,0 +1,81 @@
+import logging
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app.grading import grade_submission
+from app.models import PendingSubmission
+
+logger = logging.getLogger(__name__)
+
+# In 'queued' submission mode start_exam_view only spools the answers here and
+# `manage.py grade_submissions` grades them in batches.
+
+
+def enqueue(student, exam, answers):
+    answers = {name: value for name, value in answers.items() if name.startswith('question_')}
+    return PendingSubmission.objects.create(student=student, exam=exam, answers=answers)
+
+
+def is_grading(student):
+    return PendingSubmission.objects.filter(student=student, status__in=['pending', 'processing']).exists()
+
+
+def requeue_stale(older_than):
+    """Give submissions claimed by a worker that died back to the queue."""
+    cutoff = timezone.now() - older_than
+    return PendingSubmission.objects.filter(status='processing', claimed_at__lt=cutoff).update(status='pending')
+
+
+def claim(batch_size):
+    """
+    Claim up to `batch_size` pending submissions, oldest first.
+
+    Each row is claimed with its own conditional UPDATE, so several worker
+    processes can drain the same spool without grading anything twice.
+    """
+    ids = list(
+        PendingSubmission.objects
+        .filter(status='pending')
+        .order_by('id')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    now = timezone.now()
+    claimed = [
+        submission_id for submission_id in ids
+        if PendingSubmission.objects.filter(id=submission_id, status='pending').update(status='processing', claimed_at=now)
+    ]
+    return list(
+        PendingSubmission.objects
+        .filter(id__in=claimed)
+        .select_related('student', 'exam')
+        .order_by('exam_id', 'id')
+    )
+
+
+def grade_batch(submissions, max_attempts=3):
+    """Grade claimed submissions in one transaction; returns (done, failed)."""
+    done, failed = [], []
+    try:
+        with transaction.atomic():
+            for submission in submissions:
+                try:
+                    grade_submission(submission.student, submission.exam, submission.answers)
+                except Exception as exc:
+                    logger.exception("Grading submission %s failed", submission.id)
+                    submission.error = str(exc)
+                    failed.append(submission)
+                else:
+                    done.append(submission)
+
+            PendingSubmission.objects.filter(id__in=[s.id for s in done]).update(
+                status='done', graded_at=timezone.now(), error=None,
+            )
+        for submission in failed:
+            submission.attempts += 1
+            submission.status = 'failed' if submission.attempts >= max_attempts else 'pending'
+            submission.save(update_fields=['attempts', 'status', 'error'])
+    finally:
+        # Worker threads each hold their own connection.
+        connection.close()
+    return len(done), len(failed)
@@ -0,0 +1,52 @@
+import os
+from datetime import timedelta
+
+from django.utils import timezone
+
+from app import submission_queue
+from app.analytics import analytics_report, results_fingerprint
+from app.item_analysis import compute_item_analysis
+from app.jobs import task
+from app.models import Job
+from app.snapshots import write_snapshot
+
+# Tasks run by `manage.py runjobs`. Report tasks return
+# {'fingerprint': ..., 'data': ...} for jobs.precomputed().
+
+
+@task('exam_analytics', max_concurrency=2)
+def exam_analytics(exam_id):
+    fingerprint = results_fingerprint(exam_id)
+    return {'fingerprint': fingerprint, 'data': analytics_report(exam_id)}
+
+
+@task('item_analysis', max_concurrency=2)
+def item_analysis(exam_id):
+    fingerprint = results_fingerprint(exam_id)
+    return {'fingerprint': fingerprint, 'data': compute_item_analysis(exam_id)}
+
+
+@task('snapshot_responses', max_concurrency=1)
+def snapshot_responses(directory, exam_ids=None):
+    directory = timezone.localtime().strftime(directory)
+    rows = write_snapshot(os.path.expanduser(directory), exam_ids)
+    return {'directory': directory, 'rows': rows}
+
+
+@task('requeue_stale_submissions')
+def requeue_stale_submissions(seconds=600):
+    return {'requeued': submission_queue.requeue_stale(timedelta(seconds=seconds))}
+
+
+@task('purge_jobs')
+def purge_jobs(days=7):
+    """Delete finished jobs older than `days`, keeping each key's latest result."""
+    cutoff = timezone.now() - timedelta(days=days)
+    old = Job.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff)
+    latest = {
+        key: job_id
+        for key, job_id in Job.objects.filter(status='done').exclude(key='')
+        .order_by('key', 'finished_at').values_list('key', 'id')
+    }
+    deleted, _ = old.exclude(id__in=latest.values()).delete()
+    return {'deleted': deleted}
@@ -1,3 +1,1083 @@
-from django.test import TestCase
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Count, F, Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+from faker import Faker
+import numpy as np
+
+from app import autosave, item_analysis, jobs, ranking, routers, running_stats, similarity, submission_queue
+from app.cron import Cron
+from app.grading import get_answer_key, get_grade, grade_submission
+from app.models import (
+    CustomUser, Exam, ExamAssignment, ExamResult, ExamStats, Job, PendingSubmission, Question, QuestionStats,
+    ScheduledJob, StudentExamSession, StudentResponse,
+)
+from app.routers import ReplicaRouter
+from app.snapshots import load_snapshot, write_snapshot
+
+
+class MigrationTests(TestCase):
+    def test_no_missing_migrations(self):
+        out = StringIO()
+        try:
+            call_command('makemigrations', 'app', check=True, dry_run=True, stdout=out)
+        except SystemExit:
+            self.fail(f"Model changes without a migration:\n{out.getvalue()}")
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite specific')
+class HotQueryPlanTests(TestCase):
+    """Every hot StudentResponse and ExamResult query must be served by an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = CustomUser.objects.create_user('teacher', password='x', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='x', role='student')
+        cls.exam = Exam.objects.create(
+            title='Exam', description='', date=timezone.now(), duration=30, created_by=cls.teacher,
+        )
+        questions = [
+            Question.objects.create(
+                exam=cls.exam, question_text=f'Q{i}', option1='a', option2='b', option3='c', option4='d',
+                correct_option='option1',
+            )
+            for i in range(3)
+        ]
+        ExamAssignment.objects.create(exam=cls.exam, student=cls.student)
+        StudentResponse.objects.bulk_create(
+            StudentResponse(student=cls.student, exam=cls.exam, question=q, selected_option='a', is_correct=True)
+            for q in questions
+        )
+
+    def hot_queries(self):
+        student, exam = self.student, self.exam
+        return {
+            # latest response of a student
+            'student_by_id': StudentResponse.objects.filter(student=student).order_by('-id')[:1],
+            # student_result_view, grading delete, autosave restore
+            'student_exam': StudentResponse.objects.filter(student=student, exam=exam).select_related('question'),
+            # student_dashboard_view and student_result_view
+            'student_recent_results': ExamResult.objects.filter(student=student).order_by('-submitted_at')[:5],
+            # exam_progress_view
+            'exam_student_count': (
+                StudentResponse.objects.filter(exam=exam, student=student).values('exam').annotate(n=Count('id'))
+            ),
+            'exam_students': StudentResponse.objects.filter(exam=exam).values('student').distinct(),
+            # exam_analytics per-student totals of the graded attempt
+            'exam_graded_totals': (
+                StudentResponse.objects
+                .filter(exam=exam, student__examresult__exam=exam, timestamp__lte=F('student__examresult__submitted_at'))
+                .values('student_id')
+                .annotate(total_correct=Count('id', filter=Q(is_correct=True)))
+            ),
+            # rank index rebuild and leaderboard
+            'exam_scores': ExamResult.objects.filter(exam=exam).order_by('score').values_list('score', flat=True),
+            'exam_top_scores': ExamResult.objects.filter(exam=exam).order_by('-score')[:10],
+        }
+
+    def test_hot_queries_use_an_index(self):
+        tables = [StudentResponse._meta.db_table, ExamResult._meta.db_table]
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(query=name):
+                plan = queryset.explain()
+                scans = [
+                    line for line in plan.splitlines()
+                    if any(f' {table}' in line for table in tables) and 'SEARCH' not in line
+                ]
+                self.assertEqual(scans, [], f"{name} scans a hot table:\n{plan}")
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite tuning')
+class SQLiteTuningTests(unittest.TestCase):
+    def test_new_connections_are_tuned(self):
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = {**connection.settings_dict, 'NAME': os.path.join(directory, 'tuned.sqlite3')}
+            tuned = type(connections['default'])(settings_dict, alias='default')
+            try:
+                with tuned.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA busy_timeout')
+                    self.assertEqual(cursor.fetchone()[0], 20000)
+                self.assertEqual(tuned.transaction_mode, 'IMMEDIATE')
+            finally:
+                tuned.close()
+
+
+# Dataset sizes for the query-budget suite. The budgets do not depend on the
+# size, so CI runs 'small'; set QUERY_BUDGET_SCALE=full to check against
+# hundreds of exams, thousands of students and about a million responses.
+DATASET_SCALES = {
+    'small': {'exams': 12, 'students': 60, 'questions': 5, 'attempts_per_exam': 30},
+    'full': {'exams': 300, 'students': 5000, 'questions': 40, 'attempts_per_exam': 85},
+}
+
+
+def seed_dataset(scale, seed=1234):
+    """Create teachers, students, exams, assignments and graded attempts."""
+    size = DATASET_SCALES[scale]
+    fake = Faker()
+    Faker.seed(seed)
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    admin = CustomUser.objects.create_user('admin', password='x', role='admin', is_staff=True, is_superuser=True)
+    teacher = CustomUser.objects.create_user('teacher', password='x', role='teacher', first_name=fake.first_name())
+    other_teacher = CustomUser.objects.create_user('teacher2', password='x', role='teacher')
+    CustomUser.objects.bulk_create(
+        CustomUser(username=f'student{i}', role='student', first_name=fake.first_name(), last_name=fake.last_name(),
+                   email=fake.email(), password='!')
+        for i in range(size['students'])
+    )
+    students = list(CustomUser.objects.filter(role='student').order_by('id'))
+
+    Exam.objects.bulk_create(
+        Exam(title=fake.sentence(nb_words=4), description=fake.paragraph(), date=now, duration=60,
+             created_by=teacher if i % 4 else other_teacher)
+        for i in range(size['exams'])
+    )
+    exams = list(Exam.objects.order_by('id'))
+    Question.objects.bulk_create(
+        Question(exam=exam, question_text=fake.sentence(), option1=fake.word(), option2=fake.word() + '2',
+                 option3=fake.word() + '3', option4=fake.word() + '4', correct_option=rng.choice(['option1', 'option2']))
+        for exam in exams for _ in range(size['questions'])
+    )
+    questions = {}
+    for question in Question.objects.order_by('id'):
+        questions.setdefault(question.exam_id, []).append(question)
+
+    assignments, responses, results = [], [], []
+    for exam in exams:
+        max_score = sum(q.marks for q in questions[exam.id])
+        for student in rng.sample(students, min(size['attempts_per_exam'], len(students))):
+            assignments.append(ExamAssignment(exam=exam, student=student))
+            score = 0
+            for question in questions[exam.id]:
+                selected = rng.choice(['option1', 'option2', 'option3'])
+                is_correct = selected == question.correct_option
+                score += question.marks if is_correct else 0
+                responses.append(StudentResponse(student=student, exam=exam, question=question,
+                                                 selected_option=getattr(question, selected), is_correct=is_correct))
+            percentage = round(score / max_score * 100, 2) if max_score else 0
+            results.append(ExamResult(student=student, exam=exam, score=score, max_score=max_score,
+                                      percentage=percentage, grade=get_grade(percentage),
+                                      passed=score >= exam.passing_marks))
+            if len(responses) >= 50000:
+                StudentResponse.objects.bulk_create(responses, batch_size=5000)
+                responses = []
+    ExamAssignment.objects.bulk_create(assignments, batch_size=5000)
+    StudentResponse.objects.bulk_create(responses, batch_size=5000)
+    ExamResult.objects.bulk_create(results, batch_size=5000)
+    running_stats.rebuild()
+
+    return {'admin': admin, 'teacher': teacher, 'other_teacher': other_teacher, 'students': students, 'exams': exams}
+
+
+class RunningStatsTests(TestCase):
+    def test_reattempts_match_a_rebuild(self):
+        seed_dataset('small')
+        exam = Exam.objects.order_by('id').first()
+        questions = list(exam.questions.order_by('id'))
+        graded = ExamResult.objects.filter(exam=exam).select_related('student')[:3]
+        newcomer = CustomUser.objects.create_user('newcomer', password='x', role='student')
+
+        for result in graded:
+            grade_submission(result.student, exam, {f"question_{q.id}": q.option1 for q in questions})
+        grade_submission(newcomer, exam, {f"question_{questions[0].id}": questions[0].option2})
+        grade_submission(newcomer, exam, {f"question_{q.id}": q.option2 for q in questions})
+
+        incremental = self.snapshot()
+        running_stats.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(ExamStats.objects.get(exam=exam).attempt_count, ExamResult.objects.filter(exam=exam).count())
+
+    def test_deleted_results_are_subtracted(self):
+        seed_dataset('small')
+        exam = Exam.objects.order_by('id').first()
+        questions = list(exam.questions.order_by('id'))
+        result = ExamResult.objects.filter(exam=exam).select_related('student').first()
+        # Reattempt first, so the student's responses span both attempts' timestamps
+        grade_submission(result.student, exam, {f"question_{questions[0].id}": questions[0].option1})
+        attempts = ExamStats.objects.get(exam=exam).attempt_count
+
+        result.student.delete()
+        self.assertEqual(ExamStats.objects.get(exam=exam).attempt_count, attempts - 1)
+        incremental = self.snapshot()
+        running_stats.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+        exam.delete()
+        self.assertFalse(ExamStats.objects.filter(exam_id=exam.pk).exists())
+
+    def snapshot(self):
+        return (
+            list(ExamStats.objects.order_by('exam_id').values_list(
+                'exam_id', 'attempt_count', 'pass_count', 'score_sum', 'score_sq_sum')),
+            list(QuestionStats.objects.order_by('question_id').values_list(
+                'question_id', 'attempt_count', 'correct_count')),
+        )
+
+
+class AnswerKeyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_dataset('small')
+        cls.student = CustomUser.objects.create_user('newcomer', password='x', role='student')
+
+    def setUp(self):
+        cache.clear()
+
+    def grade(self, answers):
+        exam = Exam.objects.get(pk=self.data['exams'][0].pk)
+        return grade_submission(self.student, exam, answers)
+
+    def test_question_changes_reach_every_process(self):
+        questions = list(Exam.objects.get(pk=self.data['exams'][0].pk).questions.order_by('id'))
+        answers = {f"question_{q.id}": q.option3 for q in questions}
+        self.assertEqual(self.grade(answers).score, 0)
+
+        # The version bump lands in another process's cache, not this one's
+        with mock.patch('app.signals.bump_exam_version'):
+            question = questions[0]
+            question.correct_option = 'option3'
+            question.save()
+            result = self.grade(answers)
+            self.assertEqual(result.score, question.marks)
+
+            questions[1].delete()
+            result = self.grade(answers)
+            self.assertEqual(result.max_score, sum(q.marks for q in questions) - questions[1].marks)
+
+
+    def test_readers_without_the_exam_row_see_question_changes(self):
+        exam = self.data['exams'][0]
+        question = exam.questions.order_by('id').first()
+        get_answer_key(exam.id)
+        with mock.patch('app.signals.bump_exam_version'):
+            question.correct_option = 'option3'
+            question.save()
+        self.assertEqual(get_answer_key(exam.id).correct_text[question.id], question.option3)
+
+class ResponseSnapshotTests(TestCase):
+    def test_snapshot_round_trip(self):
+        data = seed_dataset('small')
+        exam_ids = [exam.id for exam in data['exams'][:3]]
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('snapshot_responses', directory, '--from-exam', exam_ids[0], '--to-exam', exam_ids[-1],
+                         '--chunk-size', 50, stdout=StringIO())
+            snapshot = load_snapshot(directory)
+
+            responses = StudentResponse.objects.filter(exam_id__in=exam_ids)
+            self.assertEqual(len(snapshot), responses.count())
+            self.assertIsInstance(snapshot['is_correct'], np.memmap)
+            self.assertEqual(int(snapshot['is_correct'].sum()), responses.filter(is_correct=True).count())
+
+            exam = snapshot.exam(exam_ids[1])
+            self.assertEqual(len(exam['question_id']), responses.filter(exam_id=exam_ids[1]).count())
+            self.assertTrue(((exam['option'] >= 0) & (exam['option'] <= 2)).all())
+
+    def test_snapshot_does_not_hold_a_transaction(self):
+        # Under SQLite's IMMEDIATE mode any transaction would block writers for the whole dump
+        seed_dataset('small')
+        with tempfile.TemporaryDirectory() as directory, CaptureQueriesContext(connection) as queries:
+            rows = write_snapshot(directory)
+        self.assertEqual(rows, StudentResponse.objects.count())
+        self.assertFalse([query for query in queries.captured_queries if query['sql'].startswith('SAVEPOINT')])
+
+
+class ItemAnalysisTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_dataset('small')
+        cls.exam = cls.data['exams'][0]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_kr20_and_point_biserial(self):
+        report = item_analysis.compute_item_analysis(self.exam.id)
+        questions = list(self.exam.questions.order_by('id'))
+        rows = {}
+        for response in StudentResponse.objects.filter(exam=self.exam):
+            rows.setdefault(response.student_id, {})[response.question_id] = int(response.is_correct)
+        matrix = [[rows[student][q.id] for q in questions] for student in sorted(rows)]
+
+        k, n = len(questions), len(matrix)
+        totals = [sum(row) for row in matrix]
+        mean = sum(totals) / n
+        variance = sum((t - mean) ** 2 for t in totals) / n
+        pq = sum((p := sum(row[j] for row in matrix) / n) * (1 - p) for j in range(k))
+        self.assertAlmostEqual(report['kr20'], k / (k - 1) * (1 - pq / variance))
+
+        item = [row[0] for row in matrix]
+        rest = [t - row[0] for t, row in zip(totals, matrix)]
+        expected = np.corrcoef(item, rest)[0, 1]
+        self.assertAlmostEqual(report['questions'][0]['point_biserial'], round(float(expected), 3))
+        self.assertEqual(sum(d['count'] for d in report['questions'][0]['distractors']), n)
+
+    def test_skipped_questions_count_as_unanswered(self):
+        questions = list(self.exam.questions.order_by('id'))
+        before = item_analysis.compute_item_analysis(self.exam.id)['questions'][0]['unanswered']
+        newcomer = CustomUser.objects.create_user('newcomer', password='x', role='student')
+        grade_submission(newcomer, self.exam, {f"question_{q.id}": q.option1 for q in questions[1:]})
+        self.assertEqual(item_analysis.compute_item_analysis(self.exam.id)['questions'][0]['unanswered'], before + 1)
+
+    def test_large_cohorts_are_analysed_in_the_background(self):
+        with mock.patch.object(item_analysis, 'SYNC_LIMIT', 0), \
+                mock.patch.object(item_analysis._executor, 'submit') as submit:
+            self.assertEqual(item_analysis.get_item_analysis(self.exam.id), (None, True))
+            self.assertEqual(item_analysis.get_item_analysis(self.exam.id), (None, True))
+        self.assertEqual(submit.call_count, 1)
+
+
+class AnswerSimilarityTests(TestCase):
+    def test_copied_wrong_answers_are_flagged(self):
+        rng = np.random.default_rng(7)
+        options = rng.integers(0, 4, size=(300, 70)).astype(np.int8)
+        correct_options = rng.integers(0, 4, size=70)
+        options[250] = options[12]
+        pairs, stats, _ = similarity.find_similar_pairs(options, correct_options)
+
+        self.assertEqual(stats['pairs'], 300 * 299 // 2)
+        self.assertEqual(pairs[0][:2], (12, 250))
+        self.assertEqual(pairs[0][3], int((options[12] != correct_options).sum()))
+
+    def test_counts_match_pairwise_comparison(self):
+        rng = np.random.default_rng(3)
+        options = rng.integers(-1, 4, size=(40, 9)).astype(np.int8)
+        correct_options = rng.integers(0, 4, size=9)
+        pairs, _, _ = similarity.find_similar_pairs(options, correct_options, min_shared_wrong=0,
+                                                     z_threshold=float('-inf'), limit=10 ** 6)
+        expected = sorted(
+            (i, j, int(((a == b) & (a >= 0)).sum()), int(((a == b) & (a >= 0) & (a != correct_options)).sum()))
+            for i, a in enumerate(options) for j, b in enumerate(options) if i < j
+        )
+        self.assertEqual(sorted(pair[:4] for pair in pairs), expected)
+
+
+class RankIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_rank_follows_submissions(self):
+        data = seed_dataset('small')
+        exam = data['exams'][0]
+        questions = list(exam.questions.all())
+        scores = sorted(ExamResult.objects.filter(exam=exam).values_list('score', flat=True))
+        top = max(scores)
+        self.assertEqual(ranking.rank(exam.id, top)[:2], (1, len(scores)))
+
+        # A perfect reattempt by the lowest scorer moves them to the top
+        lowest = ExamResult.objects.filter(exam=exam).order_by('score').first()
+        perfect = {f"question_{q.id}": getattr(q, q.correct_option) for q in questions}
+        with self.captureOnCommitCallbacks(execute=True):
+            grade_submission(lowest.student, exam, perfect)
+        new_score = sum(q.marks for q in questions)
+        self.assertEqual(ranking.score_index(exam.id), sorted(scores[1:] + [new_score]))
+        self.assertEqual(ranking.rank(exam.id, new_score)[:2], (1, len(scores)))
+        self.assertEqual(ranking.leaderboard(exam.id, 1)[0].student, lowest.student)
+
+    def test_index_updated_elsewhere_is_rebuilt(self):
+        data = seed_dataset('small')
+        exam = data['exams'][0]
+        count = ExamResult.objects.filter(exam=exam).count()
+        self.assertEqual(ranking.rank(exam.id, 0)[1], count)
+
+        # Graded by another process, whose cache this one does not see
+        newcomer = CustomUser.objects.create_user('newcomer', password='x', role='student')
+        with mock.patch.object(ranking, 'record_score'), self.captureOnCommitCallbacks(execute=True):
+            grade_submission(newcomer, Exam.objects.get(pk=exam.pk), {})
+        self.assertEqual(ranking.rank(exam.id, 0)[1], count + 1)
+
+
+class AutosaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        teacher = CustomUser.objects.create_user('teacher', password='x', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='x', role='student')
+        cls.exam = Exam.objects.create(title='Autosave', description='', date=timezone.now(), duration=60,
+                                       created_by=teacher)
+        cls.questions = [
+            Question.objects.create(exam=cls.exam, question_text=f'Q{i}', option1='a', option2='b', option3='c',
+                                    option4='d', correct_option='option1')
+            for i in range(3)
+        ]
+        ExamAssignment.objects.create(exam=cls.exam, student=cls.student)
+
+    def setUp(self):
+        cache.clear()
+        # Buffered, as with a shared cache
+        patcher = mock.patch.object(autosave, 'FLUSH_INTERVAL', 30)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(self.student)
+        self.client.get(reverse('start_exam', args=[self.exam.id]))
+
+    def post(self, data):
+        response = self.client.post(reverse('autosave_answer', args=[self.exam.id]), data)
+        self.assertTrue(response.json()['saved'])
+        return response.json()
+
+    def save(self, question, option):
+        return self.post({'question_id': question.id, 'selected_option': option})
+
+    def saved(self):
+        return sorted(
+            StudentResponse.objects.filter(student=self.student, exam=self.exam)
+            .values_list('question_id', 'selected_option', 'is_correct')
+        )
+
+    def test_changed_answers_are_flushed(self):
+        question = self.questions[0]
+        with mock.patch.object(autosave, 'FLUSH_INTERVAL', 0):
+            for option in 'abc':
+                self.save(question, option)
+        self.assertEqual(StudentResponse.objects.get(student=self.student, question=question).selected_option, 'c')
+
+    def test_rejects_saves_outside_an_open_exam(self):
+        url = reverse('autosave_answer', args=[self.exam.id])
+        other = Question.objects.create(exam=Exam.objects.create(title='Other', description='', date=timezone.now(),
+                                                                 duration=60),
+                                        question_text='Q', option1='a', option2='b', option3='c', option4='d',
+                                        correct_option='option1')
+        self.assertEqual(self.client.post(url, {'question_id': 'x', 'selected_option': 'a'}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'question_id': other.id, 'selected_option': 'a'}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'question_id': self.questions[0].id}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+        other_url = reverse('autosave_answer', args=[other.exam_id])
+        self.assertEqual(self.client.post(other_url, {'question_id': other.id, 'selected_option': 'a'}).status_code, 409)
+
+    def test_answers_are_buffered_and_upserted(self):
+        first, second = self.questions[:2]
+        self.assertFalse(self.save(first, 'b')['flushed'])
+        self.assertEqual(self.saved(), [])
+
+        with mock.patch.object(autosave, 'FLUSH_INTERVAL', 0):
+            self.save(second, 'a')
+            self.assertTrue(self.save(first, 'a')['flushed'])
+        self.assertEqual(self.saved(), [(first.id, 'a', True), (second.id, 'a', True)])
+
+    def test_saves_do_not_overwrite_each_other(self):
+        first, second = self.questions[:2]
+        # Both requests read the buffer before either writes it
+        session = StudentExamSession.objects.get(student=self.student, exam=self.exam)
+        answer_key = get_answer_key(self.exam.id)
+        with mock.patch.object(autosave.cache, 'get', return_value=None):
+            autosave.buffer_answer(session, first.id, 'a', answer_key)
+            autosave.buffer_answer(session, second.id, 'b', answer_key)
+        self.assertEqual(autosave.saved_answers(session, answer_key),
+                         {f'question_{first.id}': 'a', f'question_{second.id}': 'b'})
+
+    def test_page_flushes_buffered_answers(self):
+        first = self.questions[0]
+        self.save(first, 'b')
+        self.assertTrue(self.post({'flush': '1'})['flushed'])
+        self.assertEqual(self.saved(), [(first.id, 'b', False)])
+
+        # Flushing again keeps answers buffered since, without duplicating rows
+        self.save(first, 'a')
+        self.post({'flush': '1'})
+        self.assertEqual(self.saved(), [(first.id, 'a', True)])
+
+    def test_saved_answers_are_restored_after_a_reload(self):
+        first, second = self.questions[:2]
+        with mock.patch.object(autosave, 'FLUSH_INTERVAL', 0):
+            self.save(first, 'b')
+            self.save(second, 'c')
+        self.save(first, 'd')
+
+        response = self.client.get(reverse('start_exam', args=[self.exam.id]))
+        self.assertEqual(response.context['saved_answers'], {f'question_{first.id}': 'd', f'question_{second.id}': 'c'})
+
+    def test_autosaved_answers_fill_in_the_submission(self):
+        first, second, third = self.questions
+        self.save(first, 'a')
+        self.save(second, 'b')
+        self.client.post(reverse('start_exam', args=[self.exam.id]), {f'question_{second.id}': 'a'})
+
+        result = ExamResult.objects.get(student=self.student, exam=self.exam)
+        self.assertEqual(result.score, first.marks + second.marks)
+        self.assertEqual(
+            dict(StudentResponse.objects.filter(student=self.student).values_list('question_id', 'selected_option')),
+            {first.id: 'a', second.id: 'a', third.id: 'Not Answered'},
+        )
+        # The attempt is over, so further saves are refused
+        response = self.client.post(reverse('autosave_answer', args=[self.exam.id]),
+                                    {'question_id': first.id, 'selected_option': 'b'})
+        self.assertEqual(response.status_code, 409)
+
+
+def _exam_fixture():
+    teacher = CustomUser.objects.create_user('teacher', password='x', role='teacher')
+    exam = Exam.objects.create(title='Fixture', description='', date=timezone.now(), duration=60, passing_marks=5,
+                               created_by=teacher)
+    questions = [
+        Question.objects.create(exam=exam, question_text=f'Q{i}', option1='a', option2='b', option3='c',
+                                option4='d', correct_option='option1')
+        for i in range(2)
+    ]
+    students = [CustomUser.objects.create_user(f'student{i}', password='x', role='student') for i in range(3)]
+    ExamAssignment.objects.bulk_create(ExamAssignment(exam=exam, student=student) for student in students)
+    return exam, questions, students
+
+
+class ExamPaperTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.exam, cls.questions, students = _exam_fixture()
+        cls.student = students[0]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+
+    def paper(self):
+        return self.client.get(reverse('start_exam', args=[self.exam.id])).context['paper_html']
+
+    def test_question_changes_replace_the_cached_paper(self):
+        first, second = self.questions
+        self.assertIn(f'name="question_{second.id}"', self.paper())
+
+        first.question_text = 'Edited question'
+        first.option3 = 'edited option'
+        first.save()
+        paper = self.paper()
+        self.assertIn('Edited question', paper)
+        self.assertIn('edited option', paper)
+
+        second.delete()
+        self.assertNotIn(f'name="question_{second.id}"', self.paper())
+
+    def test_question_changes_reach_every_process(self):
+        self.paper()
+        # The version bump lands in another process's cache, not this one's
+        with mock.patch('app.signals.bump_exam_version'):
+            question = self.questions[0]
+            question.question_text = 'Edited elsewhere'
+            question.save()
+            self.assertIn('Edited elsewhere', self.paper())
+
+
+@override_settings(EXAM_SUBMISSION_MODE='queued')
+class QueuedSubmissionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.exam, cls.questions, cls.students = _exam_fixture()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_submissions_are_graded_from_the_spool(self):
+        student = self.students[0]
+        self.client.force_login(student)
+        self.client.get(reverse('start_exam', args=[self.exam.id]))
+        answers = {f'question_{q.id}': 'a' for q in self.questions}
+        response = self.client.post(reverse('start_exam', args=[self.exam.id]), {**answers, 'other': 'x'})
+        self.assertRedirects(response, reverse('student_result'))
+
+        submission = PendingSubmission.objects.get(student=student)
+        self.assertEqual((submission.status, submission.answers), ('pending', answers))
+        self.assertFalse(ExamResult.objects.filter(student=student).exists())
+        self.assertTrue(self.client.get(reverse('student_result')).context['grading'])
+
+        self.assertEqual(submission_queue.grade_batch(submission_queue.claim(10)), (1, 0))
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, 'done')
+        result = self.client.get(reverse('student_result')).context['exam_result']
+        self.assertEqual((result['correct_answers'], result['status']), (sum(q.marks for q in self.questions), 'Pass'))
+
+    def test_each_submission_is_claimed_once(self):
+        for student in self.students:
+            submission_queue.enqueue(student, self.exam, {})
+        first, rest = submission_queue.claim(1), submission_queue.claim(10)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(rest), 2)
+        self.assertNotIn(first[0].id, {submission.id for submission in rest})
+        self.assertEqual(submission_queue.claim(10), [])
+
+    def test_failed_submissions_are_retried(self):
+        submission_queue.enqueue(self.students[0], self.exam, {})
+        with mock.patch.object(submission_queue, 'grade_submission', side_effect=ValueError('boom')), \
+                self.assertLogs('app.submission_queue', 'ERROR'):
+            self.assertEqual(submission_queue.grade_batch(submission_queue.claim(1), max_attempts=2), (0, 1))
+            submission = PendingSubmission.objects.get()
+            self.assertEqual((submission.status, submission.attempts, submission.error), ('pending', 1, 'boom'))
+            submission_queue.grade_batch(submission_queue.claim(1), max_attempts=2)
+        self.assertEqual(PendingSubmission.objects.get().status, 'failed')
+
+
+class GradeSubmissionsCommandTests(TransactionTestCase):
+    """The command grades in worker threads, which only see committed rows."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_command_drains_the_spool(self):
+        exam, questions, students = _exam_fixture()
+        for student in students:
+            submission_queue.enqueue(student, exam, {f'question_{questions[0].id}': 'a'})
+        out = StringIO()
+        call_command('grade_submissions', workers=1, batch_size=2, stdout=out)
+
+        self.assertIn('Done: 3 graded, 0 failed.', out.getvalue())
+        self.assertEqual(set(PendingSubmission.objects.values_list('status', flat=True)), {'done'})
+        self.assertEqual(
+            list(ExamResult.objects.filter(exam=exam).values_list('score', flat=True)),
+            [questions[0].marks] * 3,
+        )
+
+
+# The test database stands in for the replica; the router is spied on to see
+# where each result read would have gone.
+@override_settings(REPLICA_DATABASE='default')
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_dataset('small')
+        cls.exam = cls.data['exams'][1]
+        cls.student = ExamResult.objects.filter(exam=cls.exam).first().student
+
+    def setUp(self):
+        cache.clear()
+        self.reads = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            if model in (ExamResult, StudentResponse):
+                self.reads.append(routers.reading_from_replica())
+            return db_for_read(router, model, **hints)
+
+        patcher = mock.patch.object(ReplicaRouter, 'db_for_read', spy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_designated_views_read_from_the_replica(self):
+        self.client.force_login(self.data['teacher'])
+        self.client.get(reverse('exam_leaderboard', args=[self.exam.id]))
+        self.assertTrue(self.reads and all(self.reads))
+
+        # Streamed after the view returns, still from the replica
+        self.reads.clear()
+        response = self.client.get(reverse('export_exam_results', args=[self.exam.id]))
+        b''.join(response.streaming_content)
+        self.assertTrue(self.reads and all(self.reads))
+
+        self.reads.clear()
+        self.client.force_login(self.student)
+        self.client.get(reverse('student_result'))
+        self.assertTrue(self.reads and not any(self.reads))
+
+    def test_a_write_pins_the_client_to_the_primary(self):
+        self.client.force_login(self.data['teacher'])
+        url = reverse('exam_leaderboard', args=[self.exam.id])
+        self.assertNotIn(routers.PIN_COOKIE, self.client.get(url).cookies)
+
+        response = self.client.post(reverse('exam_create'), {
+            'title': 'New exam', 'description': 'x', 'date': '2026-01-01 10:00', 'duration': 30,
+            'marks_per_question': 1, 'passing_marks': 1,
+        })
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        self.reads.clear()
+        self.client.get(url)
+        self.assertTrue(self.reads and not any(self.reads))
+
+    def test_unnamed_admin_routes_stay_on_the_primary(self):
+        self.client.force_login(self.data['admin'])
+        response = self.client.get('/admin/no-such-page/')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_no_replica_configured(self):
+        self.client.force_login(self.data['teacher'])
+        self.client.get(reverse('exam_leaderboard', args=[self.exam.id]))
+        self.assertTrue(self.reads and not any(self.reads))
+
+    def test_sync_replica_copies_a_consistent_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source, target = os.path.join(directory, 'primary.sqlite3'), os.path.join(directory, 'replica.sqlite3')
+            primary = sqlite3.connect(source)
+            primary.execute('PRAGMA journal_mode = WAL')
+            primary.execute('CREATE TABLE result (score INTEGER)')
+            primary.executemany('INSERT INTO result VALUES (?)', [(1,), (2,)])
+            primary.commit()
+            call_command('sync_replica', source=source, target=target, stdout=StringIO())
+            primary.execute('INSERT INTO result VALUES (3)')
+            primary.commit()
+            primary.close()
+
+            replica = sqlite3.connect(f"file:{target}?mode=ro", uri=True)
+            try:
+                self.assertEqual(replica.execute('SELECT COUNT(*) FROM result').fetchone()[0], 2)
+                self.assertEqual(replica.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+            finally:
+                replica.close()
+
+
+class CronTests(unittest.TestCase):
+    def test_next_after(self):
+        start = datetime(2026, 1, 30, 23, 59)
+        self.assertEqual(Cron('*/15 * * * *').next_after(start), datetime(2026, 1, 31, 0, 0))
+        self.assertEqual(Cron('0 3 * * *').next_after(start), datetime(2026, 1, 31, 3, 0))
+        self.assertEqual(Cron('30 9 * * 1-5').next_after(start), datetime(2026, 2, 2, 9, 30))  # Monday
+        self.assertEqual(Cron('0 0 29 2 *').next_after(start), datetime(2028, 2, 29, 0, 0))
+        # Either day field matches when both are restricted
+        self.assertEqual(Cron('0 12 15 * 0').next_after(start), datetime(2026, 2, 1, 12, 0))
+
+    def test_invalid_expressions(self):
+        for expression in ['* * * *', '60 * * * *', '*/0 * * * *', '5-1 * * * *', '0 0 31 2 *']:
+            with self.subTest(expression=expression), self.assertRaises(ValueError):
+                Cron(expression).next_after(datetime(2026, 1, 1))
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        self.registry = dict(jobs.registry)
+        self.calls = []
+        self.addCleanup(lambda: (jobs.registry.clear(), jobs.registry.update(self.registry)))
+
+        @jobs.task('test_echo', max_concurrency=1, max_attempts=2)
+        def echo(value):
+            self.calls.append(value)
+            if value == 'boom':
+                raise RuntimeError('boom')
+            return {'value': value}
+
+    def test_duplicate_keys_are_not_enqueued(self):
+        self.assertIsNotNone(jobs.enqueue('test_echo', key='k', value=1))
+        self.assertIsNone(jobs.enqueue('test_echo', key='k', value=2))
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_claim_respects_concurrency(self):
+        for value in range(3):
+            jobs.enqueue('test_echo', value=value)
+        self.assertEqual(len(jobs.claim(5)), 1)
+        self.assertEqual(jobs.claim(5), [])
+
+    def test_execute_records_result_and_retries(self):
+        job = jobs.enqueue('test_echo', value='ok')
+        jobs.claim(1)
+        self.assertEqual(jobs.execute(job.id), 'done')
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'value': 'ok'})
+        self.assertIsNotNone(job.duration_ms)
+
+        job = jobs.enqueue('test_echo', value='boom')
+        Job.objects.filter(id=job.id).update(status='running', attempts=1)
+        self.assertEqual(jobs.execute(job.id), 'pending')
+        Job.objects.filter(id=job.id).update(status='running', attempts=2)
+        self.assertEqual(jobs.execute(job.id), 'failed')
+        self.assertIn('RuntimeError', Job.objects.get(id=job.id).error)
+
+    def test_scheduled_jobs_enqueue_once_per_run(self):
+        scheduled = ScheduledJob.objects.create(name='echo', task='test_echo', cron='0 * * * *', args={'value': 1})
+        now = timezone.now()
+        jobs.schedule_due(now)
+        scheduled.refresh_from_db()
+        self.assertGreater(scheduled.next_run_at, now)
+        self.assertEqual(jobs.schedule_due(scheduled.next_run_at), 1)
+        self.assertEqual(jobs.schedule_due(scheduled.next_run_at), 0)
+        self.assertEqual(Job.objects.filter(task='test_echo').count(), 1)
+
+    @override_settings(REPORTS_MODE='jobs')
+    def test_analytics_served_from_the_latest_job(self):
+        data = seed_dataset('small')
+        exam = data['exams'][0]
+        self.client.force_login(data['teacher'])
+        url = reverse('exam_analytics', args=[exam.id])
+
+        self.assertTrue(self.client.get(url).context['pending'])
+        job = Job.objects.get(task='exam_analytics')
+        jobs.claim(1)
+        jobs.execute(job.id)
+
+        response = self.client.get(url)
+        self.assertFalse(response.context['pending'])
+        self.assertEqual(response.context['summary']['students'], ExamResult.objects.filter(exam=exam).count())
+        self.assertEqual(Job.objects.filter(task='exam_analytics').count(), 1)
+
+
+class RunJobsCommandTests(unittest.TestCase):
+    """
+    runjobs spawns worker processes, which cannot see the in-memory test
+    database, so the command runs in a fresh interpreter on a file database.
+    """
+
+    SCRIPT = (
+        "import django\n"
+        "django.setup()\n"
+        "from django.core.management import call_command\n"
+        "from app import jobs\n"
+        "from app.models import Job\n"
+        "call_command('migrate', verbosity=0)\n"
+        "job = jobs.enqueue('purge_jobs')\n"
+        "call_command('runjobs', processes=1)\n"
+        "print(Job.objects.get(id=job.id).status)\n"
+    )
+
+    def test_runjobs_executes_jobs_in_worker_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': 'online_exam_portal.settings',
+                'DB_ENGINE': 'sqlite',
+                'DB_NAME': os.path.join(directory, 'jobs.sqlite3'),
+                'DB_REPLICA_NAME': '',
+            }
+            result = subprocess.run(
+                [sys.executable, '-c', self.SCRIPT], cwd=settings.BASE_DIR, env=env,
+                capture_output=True, text=True, timeout=300,
+            )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('Job 1: done.', result.stdout, result.stderr)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], 'done')
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every named route, requested as the role that uses it, must stay within a
+    fixed number of queries however much data there is. An N+1 loop over
+    students, exams or responses blows the budget.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_dataset(os.environ.get('QUERY_BUDGET_SCALE', 'small'))
+        cls.teacher = cls.data['teacher']
+        cls.exam = Exam.objects.filter(created_by=cls.teacher).order_by('id').first()
+        cls.question = cls.exam.questions.order_by('id').first()
+        cls.student = ExamAssignment.objects.filter(exam=cls.exam).order_by('id').first().student
+
+    def setUp(self):
+        cache.clear()
+
+    def users(self, role):
+        return {
+            'admin': self.data['admin'],
+            'teacher': self.teacher,
+            'student': self.student,
+        }.get(role)
+
+    def assert_budget(self, role, url, budget, method='get', data=None, setup=None):
+        if role != 'anonymous':
+            self.client.force_login(self.users(role))
+        if setup:
+            setup(self)
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data or {})
+        self.assertLess(response.status_code, 500)
+        self.assertLessEqual(
+            len(queries), budget,
+            f"{url} ran {len(queries)} queries (budget {budget}):\n"
+            + "\n".join(query['sql'] for query in queries.captured_queries),
+        )
+
+    def test_submit(self):
+        # Submitting is the hottest write path
+        answers = {f"question_{question.id}": question.option1 for question in self.exam.questions.all()}
+        self.assert_budget('student', reverse('start_exam', args=[self.exam.id]), 19, 'post', answers, _open_exam)
+
+    def test_teacher_dashboard_cached_until_submission(self):
+        url = reverse('teacher_dashboard')
+        self.client.force_login(self.teacher)
+        student_count = self.client.get(url).context['student_count']
+        self.assert_budget('teacher', url, 2)
+
+        newcomer = CustomUser.objects.create_user('newcomer', password='x', role='student')
+        with self.captureOnCommitCallbacks(execute=True):
+            grade_submission(newcomer, self.exam, {})
+        self.assertEqual(self.client.get(url).context['student_count'], student_count + 1)
+
+    def test_cached_pages_skip_exam_queries_until_an_exam_changes(self):
+        home = reverse('home')
+        instructions = reverse('exam_instructions', args=[self.exam.id])
+        self.client.get(home)
+        self.assert_budget('anonymous', home, 0)
+        self.client.force_login(self.student)
+        self.client.get(instructions)
+        self.assert_budget('student', instructions, 2)
+
+        self.exam.title = 'Renamed exam'
+        self.exam.save()
+        self.assertContains(self.client.get(instructions), 'Renamed exam')
+        self.client.force_login(self.teacher)
+        self.assertContains(self.client.get(reverse('exam_dashboard')), 'Renamed exam')
+        self.client.logout()
+        self.assertNotEqual(self.client.get(home).content, self.client.get(home, {'page': 2}).content)
+
+        self.exam.delete()
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(instructions).status_code, 404)
+
+    def test_home_page_numbers_are_clamped_before_caching(self):
+        home = reverse('home')
+        self.client.get(home, {'page': 1000})
+        last = -(-Exam.objects.count() // 5)
+        self.assertGreater(last, 1)
+        self.assert_budget('anonymous', f"{home}?page={last}", 0)
+
+    def test_dashboard_page_numbers_are_normalised_before_caching(self):
+        dashboard = reverse('teacher_dashboard')
+        self.client.force_login(self.teacher)
+        self.client.get(dashboard)
+        for page in ('abc', '-3', '0'):
+            self.assert_budget('teacher', f"{dashboard}?page={page}", 2)
+        last = self.client.get(dashboard, {'page': 1000}).context['student_page']['number']
+        self.assertGreater(last, 1)
+        self.assert_budget('teacher', f"{dashboard}?page={last}", 2)
+        self.assert_budget('teacher', f"{dashboard}?page=1000", 2)
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.db',
+        AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend'],
+    )
+    def test_uncached_sessions_and_users_cost_two_queries(self):
+        url = reverse('student_profile')
+        self.assert_budget('student', url, 2, setup=lambda test: test.client.get(url))
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+        AUTHENTICATION_BACKENDS=['app.backends.CachedModelBackend'],
+    )
+    def test_cached_user_is_refreshed_after_a_profile_edit(self):
+        url = reverse('student_profile')
+        self.assert_budget('student', url, 0, setup=lambda test: test.client.get(url))
+
+        response = self.client.post(url, {'first_name': 'Renamed', 'last_name': 'Student', 'email': 'r@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.get(url).context['user'].first_name, 'Renamed')
+
+        self.student.set_password('changed')
+        self.student.save()
+        # The session hash no longer matches, so the cached user is not trusted
+        self.assertRedirects(self.client.get(url), f"{reverse('login')}?next={url}", fetch_redirect_response=False)
+
+    @override_settings(EXPORT_CHUNK_SIZE=7)
+    def test_export_streams_every_result_in_one_query(self):
+        self.client.force_login(self.teacher)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('export_exam_results', args=[self.exam.id]))
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertLessEqual(len(queries), 5)
+        self.assertEqual(len(lines) - 1, ExamResult.objects.filter(exam=self.exam).count())
+        self.assertEqual(len(lines[1].split(',')), 9 + self.exam.questions.count())
+
+    @override_settings(EXAM_PROGRESS_COUNTERS=True)
+    def test_exam_progress_with_counters(self):
+        self.assert_budget('teacher', reverse('exam_progress', args=[self.exam.id]), 7)
+
+
+def _open_exam(test):
+    test.client.get(reverse('start_exam', args=[test.exam.id]))
+
+
+# url name -> (role, url kwargs, budget[, method, post data, setup])
+QUERY_BUDGETS = {
+    'home': ('anonymous', {}, 2),
+    'signup': ('anonymous', {}, 0),
+    'admin_signup': ('anonymous', {}, 0),
+    'teacher_signup': ('anonymous', {}, 0),
+    'login': ('anonymous', {}, 0),
+    'logout': ('student', {}, 4),
+    'contact': ('anonymous', {}, 0),
+
+    'admindashboard': ('admin', {}, 2),
+    'adminstudent_list': ('admin', {}, 3),
+    'student_add': ('admin', {}, 2),
+    'student_edit': ('admin', {'pk': 'student'}, 3),
+    'student_delete': ('admin', {'pk': 'student'}, 3),
+    'teacher_list': ('admin', {}, 3),
+    'teacher_add': ('admin', {}, 2),
+    'teacher_edit': ('admin', {'pk': 'teacher'}, 3),
+    'teacher_delete': ('admin', {'pk': 'teacher'}, 3),
+
+    'exam_list': ('teacher', {}, 3),
+    'exam_create': ('teacher', {}, 2),
+    'exam_edit': ('teacher', {'pk': 'exam'}, 3),
+    'exam_delete': ('teacher', {'pk': 'exam'}, 3),
+    'question_list': ('teacher', {'exam_id': 'exam'}, 4),
+    'exam_dashboard': ('teacher', {}, 3),
+    'question_create': ('teacher', {'exam_id': 'exam'}, 4),
+    'question_edit': ('teacher', {'exam_id': 'exam', 'question_id': 'question'}, 5),
+    'question_delete': ('teacher', {'exam_id': 'exam', 'question_id': 'question'}, 4),
+
+    'student_dashboard': ('student', {}, 4),
+    'student_profile': ('student', {}, 2),
+    'profile_detail': ('student', {'user_id': 'student'}, 3),
+    'profile_edit': ('student', {'user_id': 'student'}, 3),
+    'profile_delete': ('student', {'user_id': 'student'}, 3),
+    'exam_instructions': ('student', {'exam_id': 'exam'}, 3),
+    'start_exam': ('student', {'exam_id': 'exam'}, 11),
+    'autosave_answer': ('student', {'exam_id': 'exam'}, 3, 'post', {'question_id': 'question', 'selected_option': 'x'}, _open_exam),
+    'student_result': ('student', {}, 7),
+
+    'teacher_profile': ('teacher', {}, 2),
+    'teacher_dashboard': ('teacher', {}, 7),
+    'teacherexam_list': ('teacher', {}, 3),
+    'teacherexam_create': ('teacher', {}, 2),
+    'teacherexam_edit': ('teacher', {'pk': 'exam'}, 3),
+    'teacherexam_delete': ('teacher', {'pk': 'exam'}, 3),
+    'student_list': ('teacher', {}, 4),
+    'teacher_student_edit': ('teacher', {'pk': 'student'}, 3),
+    'teacher_student_delete': ('teacher', {'pk': 'student'}, 3),
+    'assign_exam_to_student': ('teacher', {'exam_id': 'exam', 'student_id': 'student'}, 5),
+    'exam_progress': ('teacher', {'exam_id': 'exam'}, 6),
+    'exam_analytics': ('teacher', {'exam_id': 'exam'}, 9),
+    'item_analysis': ('teacher', {'exam_id': 'exam'}, 7),
+    'answer_similarity': ('teacher', {'exam_id': 'exam'}, 6),
+    'exam_leaderboard': ('teacher', {'exam_id': 'exam'}, 4),
+    'export_exam_results': ('teacher', {'exam_id': 'exam'}, 4),
+
+    'admin:index': ('admin', {}, 3),
+}
+
+
+# Known N+1 loops, kept visible here until they are fixed.
+KNOWN_N_PLUS_ONE = set()
+
+
+def _resolve(test, value):
+    return {
+        'student': test.student.pk,
+        'teacher': test.data['other_teacher'].pk,
+        'exam': test.exam.pk,
+        'question': test.question.pk,
+    }.get(value, value)
+
+
+def _make_budget_test(name, role, kwargs, budget, method='get', data=None, setup=None):
+    def test(self):
+        url = reverse(name, kwargs={key: _resolve(self, value) for key, value in kwargs.items()})
+        post_data = {key: _resolve(self, value) for key, value in (data or {}).items()}
+        self.assert_budget(role, url, budget, method, post_data, setup)
+
+    if name in KNOWN_N_PLUS_ONE:
+        test = unittest.expectedFailure(test)
+    return test
+
+
+for _name, _spec in QUERY_BUDGETS.items():
+    setattr(QueryBudgetTests, f"test_{_name.replace(':', '_')}", _make_budget_test(_name, *_spec))
+
+
+class QueryBudgetCoverageTests(TestCase):
+    def test_every_named_route_has_a_budget(self):
+        names = {name for name in get_resolver().reverse_dict if isinstance(name, str)}
+        self.assertEqual(sorted(names - set(QUERY_BUDGETS)), [])
 
-# Create your tests here.
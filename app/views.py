@@ -2,7 +2,7 @@ from django.conf import settings
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
-from app.models import Exam, Question, StudentResponse,ExamAssignment,StudentExamSession
+from app.models import Exam, ExamResult, Question, StudentResponse,StudentExamSession
 from app.forms import ExamForm, QuestionForm, TeacherSignUpForm,ExamAssignmentForm,CustomUserCreationForm, CustomUserChangeForm,StudentProfileForm,TeacherProfileForm
 from django.contrib.auth.decorators import user_passes_test, login_required
 from django.utils import timezone
@@ -10,10 +10,11 @@ from datetime import timedelta
 from .forms import CustomUserCreationForm, CustomAuthenticationForm,FeedbackForm
 from .models import CustomUser
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Sum, Q
+from django.db.models import Count, F, Sum, Q
 from django.db.models.functions import Coalesce
 from django.core.paginator import Paginator
 from django.db.models import Max
+from django.utils.functional import SimpleLazyObject
 
 # Role Check Helpers
 def is_admin(user):
@@ -26,15 +27,34 @@ def is_admin_or_teacher(user):
     return is_admin(user) or is_teacher(user)
 
 
+def parse_page_number(value):
+    # Page numbers end up in cache keys, so anything but a positive int is page 1
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
 # Home View
 def home_view(request):
     latest_exams = Exam.objects.order_by('-created_at')  # Adjust field if needed
 
     paginator = Paginator(latest_exams, 5)  # Show 5 exams per page
-    page_number = request.GET.get('page')
-    page_exams = paginator.get_page(page_number)
-  
-    return render(request, 'app/home.html', {'page_exams': page_exams})
+    version = catalog_version()
+    # Clamped to the last page, which is cached with the catalog, so the
+    # fragment key only ever holds page numbers that exist
+    num_pages = cache.get_or_set(f"home_exam_pages:{version}", lambda: paginator.num_pages,
+                                 settings.FRAGMENT_CACHE_TIMEOUT)
+    page_number = min(parse_page_number(request.GET.get('page')), num_pages)
+    # The exam list is a cached fragment; the page is only queried on a miss
+    page_exams = SimpleLazyObject(lambda: paginator.get_page(page_number))
+
+    return render(request, 'app/home.html', {
+        'page_exams': page_exams,
+        'page_number': page_number,
+        'catalog_version': version,
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+    })
 
 
 # Authentication Views
@@ -229,7 +249,11 @@ def teacher_delete(request, pk):
 @user_passes_test(is_admin_or_teacher)
 def Exam_ListView(request):
     exams = Exam.objects.filter(created_by=request.user)
-    return render(request, 'app/Exam/exam_list.html', {'exams': exams})
+    return render(request, 'app/Exam/exam_list.html', {
+        'exams': exams,
+        'teacher_version': teacher_version(request.user.id),
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+    })
 
 
 @user_passes_test(is_admin_or_teacher)
@@ -283,7 +307,11 @@ def question_listview(request, exam_id):
 @user_passes_test(is_admin_or_teacher)
 def exam_question_dashboard_view(request):
     exams = Exam.objects.all()
-    return render(request, 'app/Question/exam_question_dashboard.html', {'exams': exams})
+    return render(request, 'app/Question/exam_question_dashboard.html', {
+        'exams': exams,
+        'catalog_version': catalog_version(),
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+    })
 
 
 @user_passes_test(is_admin_or_teacher)
@@ -341,20 +369,19 @@ def student_dashboard_view(request):
 
     user = request.user
 
-   
-    latest_exam_ids = (
-        StudentResponse.objects
+    # Latest attempts: one read of the (student, -submitted_at) index on ExamResult
+    recent_results = list(
+        ExamResult.objects
         .filter(student=user)
-        .values('exam_id')
-        .annotate(latest_attempt=Max('id')) 
-        .order_by('-latest_attempt')[:5]
+        .select_related('exam')
+        .order_by('-submitted_at')[:5]
     )
-    latest_exams = Exam.objects.filter(id__in=[item['exam_id'] for item in latest_exam_ids])
 
     return render(request, 'app/student/student_dashboard.html', {
         'exams': exams,
         'user': user,
-        'latest_exams': latest_exams,
+        'recent_results': recent_results,
+        'latest_exams': [result.exam for result in recent_results],
     })
 
 
@@ -413,134 +440,178 @@ def profile_delete(request, user_id):
 
 
 def exam_instructions_view(request, exam_id):
-    exam = get_object_or_404(Exam, id=exam_id)
-    return render(request, 'app/student/exam_instructions.html', {'exam': exam})
+    return render(request, 'app/student/exam_instructions.html', {'exam': get_cached_exam(exam_id)})
+
+
+def get_cached_exam(exam_id):
+    # Keyed on the exam version, so an edited or deleted exam is never served
+    cache_key = f"exam:{exam_id}:{exam_version(exam_id)}"
+    exam = cache.get(cache_key)
+    if exam is None:
+        exam = get_object_or_404(Exam, id=exam_id)
+        cache.set(cache_key, exam, settings.FRAGMENT_CACHE_TIMEOUT)
+    return exam
 
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from datetime import timedelta
-from .models import Exam, StudentResponse
-
-# ✅ Normalize helper
-def normalize(value):
-    return value.strip().lower() if value else ""
+from datetime import datetime, timedelta
+from .models import Exam, ExamResult, ExamStats, StudentResponse
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from . import autosave, exports, jobs, progress, ranking, submission_queue
+from .caching import catalog_version, exam_version, report_timeout, teacher_version
+from .analytics import analytics_report, results_fingerprint
+from .item_analysis import get_item_analysis
+from .similarity import similarity_report
+from .grading import get_answer_key, grade_submission
 
 @login_required
 def start_exam_view(request, exam_id):
     exam = get_object_or_404(Exam, id=exam_id)
-    questions = list(exam.questions.all())
 
-    for question in questions:
-        question.options = [question.option1, question.option2, question.option3, question.option4]
+    answer_key = get_answer_key(exam.id, exam.answer_key_revision)
 
     if request.method == 'POST':
-        # ✅ Clear old responses if reattempt
-        StudentResponse.objects.filter(student=request.user, exam=exam).delete()
+        session = StudentExamSession.objects.filter(student=request.user, exam=exam, completed=False).first()
+        answers = request.POST
+        if session:
+            # Autosaved answers fill in anything missing from the final POST
+            answers = {**autosave.saved_answers(session, answer_key), **request.POST.dict()}
+
+        if settings.EXAM_SUBMISSION_MODE == 'queued':
+            # Spool the answers; `manage.py grade_submissions` grades them
+            submission_queue.enqueue(request.user, exam, answers)
+            result = None
+        else:
+            result = grade_submission(request.user, exam, answers, answer_key)
 
-        score = 0
-        for question in questions:
-            field_name = f"question_{question.id}"
-            selected_option_raw = request.POST.get(field_name)
+        if session:
+            session.completed = True
+            session.save(update_fields=['completed'])
+            autosave.discard(session, answer_key)
+        request.session.pop(f'exam_session_{exam.id}', None)
 
-            if not selected_option_raw:
-                selected_option = "Not Answered"
-                is_correct = False
-            else:
-                selected_option = normalize(selected_option_raw)
-                correct_option = normalize(getattr(question, question.correct_option, ""))  # Ensure lowercase + strip
-                is_correct = selected_option == correct_option
-
-            StudentResponse.objects.create(
-                student=request.user,
-                exam=exam,
-                question=question,
-                selected_option=selected_option_raw.strip() if selected_option_raw else "Not Answered",  # Store original text
-                is_correct=is_correct,
-                timestamp=timezone.now()
-            )
-
-            if is_correct:
-                score += question.marks
-
-        max_score = sum(q.marks for q in questions)
-        percentage = (score / max_score) * 100 if max_score > 0 else 0
-        passed = score >= exam.passing_marks
-
-        if passed:
+        if result is None:
+            messages.info(request, "📝 Exam submitted! Your answers are being graded.")
+            return redirect('student_result')
+
+        score, max_score, percentage = result.score, result.max_score, result.percentage
+        if result.passed:
             messages.success(request, f"✅ Exam submitted! You passed with {score}/{max_score} marks ({percentage:.2f}%).")
         else:
             messages.warning(request, f"❌ Exam submitted! You failed with {score}/{max_score} marks ({percentage:.2f}%).")
 
         return redirect('student_result')
 
-    end_time = timezone.now() + timedelta(minutes=exam.duration)
+    session, created = StudentExamSession.objects.get_or_create(student=request.user, exam=exam)
+    end_time = session.start_time + timedelta(minutes=exam.duration)
+    if not created and (session.completed or end_time <= timezone.now()):
+        # Previous attempt is over, start a fresh one
+        autosave.discard(session, answer_key)
+        session.start_time = timezone.now()
+        session.completed = False
+        session.save(update_fields=['start_time', 'completed'])
+        end_time = session.start_time + timedelta(minutes=exam.duration)
+        created = True
+    request.session[f'exam_session_{exam.id}'] = {
+        'id': session.id, 'start_time': session.start_time.isoformat(), 'revision': exam.answer_key_revision,
+    }
 
     return render(request, 'app/student/start_exam.html', {
         'exam': exam,
-        'questions': questions,
-        'end_time': end_time
+        'paper_html': get_exam_paper(exam),
+        'end_time': end_time,
+        'saved_answers': {} if created else autosave.saved_answers(session, answer_key),
+        'autosave_flush_interval': autosave.FLUSH_INTERVAL,
     })
 
 
+@login_required
+@require_POST
+def autosave_answer_view(request, exam_id):
+    # Session id, start time and answer key revision are kept in the Django
+    # session so autosaves never read the database
+    state = request.session.get(f'exam_session_{exam_id}')
+    if not isinstance(state, dict):
+        return JsonResponse({'error': 'No active exam session.'}, status=409)
+    answer_key = get_answer_key(exam_id, state.get('revision'))
+    session = StudentExamSession(id=state['id'], student_id=request.user.id, exam_id=exam_id,
+                                 start_time=datetime.fromisoformat(state['start_time']))
+
+    if request.POST.get('flush'):
+        # Sent by the page once the flush interval has passed, and when it is left
+        autosave.flush(session, answer_key)
+        return JsonResponse({'saved': True, 'flushed': True})
+
+    try:
+        question_id = int(request.POST.get('question_id', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid question.'}, status=400)
+    selected_option = request.POST.get('selected_option', '')
+    if not selected_option or question_id not in answer_key.correct:
+        return JsonResponse({'error': 'Invalid answer.'}, status=400)
+
+    flushed = autosave.buffer_answer(session, question_id, selected_option, answer_key)
+    return JsonResponse({'saved': True, 'flushed': flushed})
+
+
+def get_exam_paper(exam):
+    # The question block is the same for every student, so it is rendered once
+    # per answer key revision (read with the exam row, so every process agrees
+    # on it, as grading does); only the CSRF token and end time are added per
+    # request.
+    cache_key = f"exam_paper:{exam.id}:{exam.answer_key_revision}"
+    paper_html = cache.get(cache_key)
+    if paper_html is None:
+        questions = list(exam.questions.all())
+
+        for question in questions:
+            question.options = [question.option1, question.option2, question.option3, question.option4]
+
+        paper_html = render_to_string('app/student/exam_paper.html', {'questions': questions})
+        cache.set(cache_key, paper_html, getattr(settings, 'EXAM_PAPER_CACHE_TIMEOUT', 60 * 60))
+    return paper_html
+
+
 @login_required
 def student_result_view(request):
-    latest_response = StudentResponse.objects.filter(student=request.user).order_by('-id').first()
+    if submission_queue.is_grading(request.user):
+        return render(request, 'app/student/student_result.html', {'exam_result': None, 'grading': True})
+
+    result = ExamResult.objects.filter(student=request.user).select_related('exam').order_by('-submitted_at').first()
 
-    if not latest_response:
+    if not result:
         return render(request, 'app/student/student_result.html', {'exam_result': None})
 
-    latest_exam = latest_response.exam
+    latest_exam = result.exam
+    answer_key = get_answer_key(latest_exam.id, latest_exam.answer_key_revision)
     responses = StudentResponse.objects.filter(student=request.user, exam=latest_exam).select_related('question')
 
-    correct_score = 0
-    max_score = 0
     response_list = []
-
     for res in responses:
-        question = res.question
-        res.options = [question.option1, question.option2, question.option3, question.option4]
-        res.correct_option_value = getattr(question, question.correct_option)
-
-        max_score += question.marks
-        if res.is_correct:
-            correct_score += question.marks
-
+        res.options = answer_key.options[res.question_id]
+        res.correct_option_value = answer_key.correct_text[res.question_id]
         response_list.append(res)
 
-    percentage = round((correct_score / max_score) * 100, 2) if max_score > 0 else 0
-    passed = correct_score >= latest_exam.passing_marks
-
     exam_result = {
         'exam': latest_exam,
         'responses': response_list,
-        'correct_answers': correct_score,
-        'total_questions': max_score,
-        'percentage': percentage,
-        'status': "Pass" if passed else "Fail",
-        'grade': get_grade(percentage)
+        'correct_answers': result.score,
+        'total_questions': result.max_score,
+        'percentage': result.percentage,
+        'status': "Pass" if result.passed else "Fail",
+        'grade': result.grade
     }
+    exam_result['rank'], exam_result['ranked_students'], exam_result['percentile'] = ranking.rank(latest_exam.id, result.score)
 
     return render(request, 'app/student/student_result.html', {'exam_result': exam_result})
 
 
-def get_grade(percentage):
-    if percentage >= 90:
-        return "A+"
-    elif percentage >= 80:
-        return "A"
-    elif percentage >= 70:
-        return "B"
-    elif percentage >= 60:
-        return "C"
-    elif percentage >= 50:
-        return "D"
-    else:
-        return "F"
-
-
 # Teacher Dashboard
 
 @login_required
@@ -561,30 +632,69 @@ def teacher_profile_view(request):
 @user_passes_test(is_teacher, login_url='home')
 def teacher_dashboard(request):
     teacher = request.user
-    exams = Exam.objects.filter(created_by=teacher)
-    total_exams = exams.count()
-
-    responses = StudentResponse.objects.filter(exam__in=exams).select_related('student', 'exam')
-
-    student_exam_map = {}
-    for response in responses:
-        student = response.student
-        if student not in student_exam_map:
-            student_exam_map[student] = []
-        student_exam_map[student].append(response.exam)
-
-    student_count = len(student_exam_map.keys())  # distinct students
+    dashboard = get_teacher_dashboard(teacher, parse_page_number(request.GET.get('page')))
 
     context = {
         'teacher': teacher,
-        'exams': exams,
-        'exam_count': total_exams,
-        'student_count': student_count,
-        'student_exam_map': student_exam_map,
+        'exams': dashboard['exams'],
+        'exam_count': dashboard['exam_count'],
+        'student_count': dashboard['student_count'],
+        'student_page': dashboard['student_page'],
     }
     return render(request, 'app/teacher/teacher_dashboard.html', context)
 
 
+def get_teacher_dashboard(teacher, page_number):
+    # Grouped counts over ExamResult (one row per student and exam) instead of
+    # every response. Cached per teacher and page; grading a submission or
+    # changing one of the teacher's exams bumps the teacher version.
+    key_prefix = f"teacher_dashboard:{teacher.id}:{teacher_version(teacher.id)}"
+    timeout = report_timeout(getattr(settings, 'TEACHER_DASHBOARD_CACHE_TIMEOUT', 5 * 60))
+    students = (
+        ExamResult.objects
+        .filter(exam__created_by=teacher)
+        .values('student_id', 'student__username', 'student__first_name', 'student__last_name')
+        .annotate(exam_count=Count('exam_id', distinct=True), last_submitted=Max('submitted_at'))
+        .order_by('student__username', 'student_id')
+    )
+    paginator = Paginator(students, getattr(settings, 'TEACHER_DASHBOARD_PAGE_SIZE', 20))
+    # Clamped to the last page, which is cached with the dashboard, so lookups
+    # and stores use the same key and out-of-range page numbers add no keys
+    num_pages = cache.get_or_set(f"{key_prefix}:pages", lambda: paginator.num_pages, timeout)
+    page_number = min(page_number, num_pages)
+    dashboard = cache.get(f"{key_prefix}:{page_number}")
+    if dashboard is None:
+        exams = Exam.objects.filter(created_by=teacher)
+        page = paginator.get_page(page_number)
+
+        rows = list(page.object_list)
+        titles = {}
+        for student_id, title in (
+            ExamResult.objects
+            .filter(exam__created_by=teacher, student_id__in=[row['student_id'] for row in rows])
+            .order_by('exam__title')
+            .values_list('student_id', 'exam__title')
+        ):
+            titles.setdefault(student_id, []).append(title)
+        for row in rows:
+            row['exams'] = titles.get(row['student_id'], [])
+
+        dashboard = {
+            'exams': list(exams.order_by('-created_at').values('id', 'title', 'created_at')[:5]),  # Recent exams only
+            'exam_count': exams.count(),
+            'student_count': paginator.count,
+            'student_page': {
+                'rows': rows,
+                'number': page.number,
+                'num_pages': paginator.num_pages,
+                'has_previous': page.has_previous(),
+                'has_next': page.has_next(),
+            },
+        }
+        cache.set(f"{key_prefix}:{page_number}", dashboard, timeout)
+    return dashboard
+
+
 @user_passes_test(is_teacher)
 def student_list_view(request):
     students = CustomUser.objects.filter(role='student')
@@ -647,16 +757,13 @@ def assign_exam_to_student(request, exam_id, student_id=None):
 @user_passes_test(is_teacher)
 def exam_progress_view(request, exam_id):
     exam = get_object_or_404(Exam, id=exam_id)
-    total_questions = exam.questions.count()
-
-    # Get all students assigned to this exam
-    assigned_students = ExamAssignment.objects.filter(exam=exam).select_related('student')
+    total_questions = len(get_answer_key(exam.id, exam.answer_key_revision).question_ids)
 
     progress_data = []
 
-    for assignment in assigned_students:
-        student = assignment.student
-        answered_count = StudentResponse.objects.filter(exam=exam, student=student).count()
+    # Assigned students with their answered counts, without a query per student
+    for assignment in progress.assigned_progress(exam):
+        answered_count = assignment.answered
 
         status = "Not Started"
         if answered_count > 0:
@@ -665,7 +772,7 @@ def exam_progress_view(request, exam_id):
             status = "Completed"
 
         progress_data.append({
-            'student': student,
+            'student': assignment.student,
             'answered': answered_count,
             'total': total_questions,
             'status': status,
@@ -673,7 +780,8 @@ def exam_progress_view(request, exam_id):
 
     return render(request, 'app/teacher/exam_progress.html', {
         'exam': exam,
-        'progress_data': progress_data
+        'progress_data': progress_data,
+        'stats': ExamStats.objects.filter(exam=exam).first(),
     })
 
 
@@ -683,47 +791,69 @@ def exam_progress_view(request, exam_id):
 def exam_analytics(request, exam_id):
     exam = get_object_or_404(Exam, id=exam_id)
 
-    # Fetch all student responses for the given exam
-    responses = StudentResponse.objects.filter(exam=exam)
-
-    # Total unique students who attempted the exam
-    total_students = responses.values('student').distinct().count()
-
-    # Annotate each student’s score
-    student_scores = (
-        responses
-        .values('student', 'student__username')
-        .annotate(
-            total_correct=Count('id', filter=Q(is_correct=True)),
-            adjusted_total=Coalesce(Sum('adjusted_marks'), 0),
+    # Distribution and item statistics from one query over the responses,
+    # precomputed by `manage.py runjobs` when REPORTS_MODE is 'jobs'
+    pending = False
+    if jobs.reports_in_background():
+        analytics, pending = jobs.precomputed(
+            'exam_analytics', f"exam_analytics:{exam.id}", results_fingerprint(exam.id), exam_id=exam.id,
         )
-    )
-
-    max_marks = exam.questions.count() * exam.marks_per_question
-
-    for score in student_scores:
-        score['total_marks'] = score['total_correct'] * exam.marks_per_question
-        score['percentage'] = round((score['total_marks'] / max_marks) * 100, 2) if max_marks > 0 else 0
+    else:
+        analytics = analytics_report(exam.id)
+    summary = analytics['summary'] if analytics else None
 
-    # Average score for the exam
-    avg_score = (
-        sum(score['total_marks'] for score in student_scores) / total_students
-        if total_students > 0 else 0
+    # One summary row per student, written at grading time
+    student_scores = list(
+        ExamResult.objects.filter(exam=exam).select_related('student').order_by('-score', 'student__username')
     )
+    # Correct answers and teacher-adjusted marks of each student's graded attempt
+    response_totals = {
+        row['student_id']: row
+        for row in StudentResponse.objects
+        .filter(exam=exam, student__examresult__exam=exam, timestamp__lte=F('student__examresult__submitted_at'))
+        .values('student_id')
+        .annotate(total_correct=Count('id', filter=Q(is_correct=True)), adjusted_total=Coalesce(Sum('adjusted_marks'), 0))
+    }
+    for result in student_scores:
+        totals = response_totals.get(result.student_id, {})
+        result.total_correct = totals.get('total_correct', 0)
+        result.adjusted_total = totals.get('adjusted_total', 0)
+
+    # Attempt counts, mean and spread are kept up to date by grading
+    stats = ExamStats.objects.filter(exam=exam).first() or ExamStats(exam=exam)
 
     # Per-question analytics
-    question_stats = exam.questions.annotate(
-        correct_count=Count('studentresponse', filter=Q(studentresponse__is_correct=True)),
-        total_attempts=Count('studentresponse')
-    )
+    question_rows = {
+        question_id: (question_text, correct_count or 0, attempt_count or 0)
+        for question_id, question_text, correct_count, attempt_count in exam.questions.values_list(
+            'id', 'question_text', 'stats__correct_count', 'stats__attempt_count',
+        )
+    }
+    question_stats = []
+    items = analytics['questions'] if analytics else [
+        {'question_id': question_id, 'discrimination': None} for question_id in question_rows
+    ]
+    for item in items:
+        question_text, correct_count, attempt_count = question_rows.get(item['question_id'], ('', 0, 0))
+        question_stats.append(dict(
+            item,
+            question_text=question_text,
+            correct_count=correct_count,
+            total_attempts=attempt_count,
+            difficulty=round(correct_count / attempt_count, 3) if attempt_count else 0,
+        ))
 
     context = {
         'exam': exam,
-        'total_students': total_students,
-        'avg_score': round(avg_score, 2),
+        'total_students': stats.attempt_count,
+        'avg_score': round(stats.mean, 2),
+        'score_std': stats.std,
+        'summary': summary,
+        'histogram': analytics['histogram'] if analytics else [],
+        'pending': pending,
         'student_scores': student_scores,
         'question_stats': question_stats,
-        'max_marks': max_marks,
+        'max_marks': get_answer_key(exam.id, exam.answer_key_revision).max_score,
     }
 
     return render(request, 'app/teacher/exam_analytics.html', context)
@@ -731,6 +861,60 @@ def exam_analytics(request, exam_id):
 
 
 
+@user_passes_test(is_teacher)
+def item_analysis_view(request, exam_id):
+    exam = get_object_or_404(Exam, id=exam_id)
+    report, pending = get_item_analysis(exam.id)
+
+    question_stats = []
+    if report:
+        question_texts = dict(exam.questions.values_list('id', 'question_text'))
+        question_stats = [
+            dict(item, question_text=question_texts.get(item['question_id'], ''))
+            for item in report['questions']
+        ]
+
+    return render(request, 'app/teacher/item_analysis.html', {
+        'exam': exam,
+        'report': report,
+        'pending': pending,
+        'question_stats': question_stats,
+    })
+
+
+@user_passes_test(is_teacher)
+def answer_similarity_view(request, exam_id):
+    exam = get_object_or_404(Exam, id=exam_id)
+    return render(request, 'app/teacher/answer_similarity.html', {
+        'exam': exam,
+        'report': similarity_report(exam.id),
+    })
+
+
+@user_passes_test(is_teacher)
+def exam_leaderboard_view(request, exam_id):
+    exam = get_object_or_404(Exam, id=exam_id)
+    try:
+        limit = min(max(int(request.GET.get('n', 10)), 1), 100)
+    except ValueError:
+        limit = 10
+    return render(request, 'app/teacher/exam_leaderboard.html', {
+        'exam': exam,
+        'results': ranking.leaderboard(exam.id, limit),
+        'limit': limit,
+    })
+
+
+@user_passes_test(is_teacher)
+def export_exam_results(request, exam_id):
+    exam = get_object_or_404(Exam, id=exam_id)
+    response = StreamingHttpResponse(
+        exports.stream_csv(exports.exam_result_rows(exam.id)),
+        content_type='text/csv',
+    )
+    response['Content-Disposition'] = f'attachment; filename="exam-{exam.id}-results.csv"'
+    return response
+
 
 def contact_view(request):
     if request.method == 'POST':
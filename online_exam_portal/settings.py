@@ -50,6 +50,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,12 +79,147 @@ WSGI_APPLICATION = 'online_exam_portal.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# DB_ENGINE is 'sqlite' (a single db.sqlite3 file), 'mysql' (MySQL or
+# MariaDB through mysqlclient) or a backend path. DB_CONN_MAX_AGE keeps
+# connections open between requests; health checks replace a connection
+# the server has closed before it is reused.
+
+DB_ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'mysql': 'django.db.backends.mysql',
+}
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': DB_ENGINES.get(DB_ENGINE, DB_ENGINE),
+        'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3') if DB_ENGINE == 'sqlite' else 'online_exam_portal'),
+        'USER': config('DB_USER', default=''),
+        'PASSWORD': config('DB_PASSWORD', default=''),
+        'HOST': config('DB_HOST', default=''),
+        'PORT': config('DB_PORT', default=''),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': {},
+    }
+}
+# SQLite: write transactions start with BEGIN IMMEDIATE, so a writer waits
+# for the lock (up to the busy timeout) instead of failing with "database is
+# locked" when it upgrades from a read. The PRAGMAs are applied to every new
+# connection by app.signals; WAL lets readers run alongside the writer.
+SQLITE_PRAGMAS = {
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+    'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=20000, cast=int),
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-64000, cast=int),
+    'temp_store': 'MEMORY',
+}
+if DB_ENGINE == 'sqlite':
+    DATABASES['default']['OPTIONS'] = {
+        'transaction_mode': config('SQLITE_TRANSACTION_MODE', default='IMMEDIATE'),
+        'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+    }
+if DB_ENGINE == 'mysql':
+    DATABASES['default']['OPTIONS'] = {
+        'charset': 'utf8mb4',
+        'isolation_level': 'read committed',
+        'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+        'connect_timeout': config('DB_CONNECT_TIMEOUT', default=10, cast=int),
+    }
+    DATABASES['default']['TEST'] = {'CHARSET': 'utf8mb4', 'COLLATION': 'utf8mb4_unicode_ci'}
+
+# Read replica: DB_REPLICA_NAME adds a 'replica' database (same engine and
+# credentials unless DB_REPLICA_HOST/DB_REPLICA_PORT say otherwise). The
+# views in REPLICA_VIEWS and the admin change lists read the models in
+# REPLICA_MODELS from it. A client that writes is pinned to the primary for
+# REPLICA_PIN_SECONDS so it sees its own changes. For SQLite the replica is
+# a read-only copy refreshed by `manage.py sync_replica`, which swaps in a new
+# file; its connections are closed after every request so the next one opens
+# the latest copy.
+DB_REPLICA_NAME = config('DB_REPLICA_NAME', default='')
+REPLICA_DATABASE = 'replica' if DB_REPLICA_NAME else None
+if REPLICA_DATABASE:
+    DATABASES[REPLICA_DATABASE] = {
+        **DATABASES['default'],
+        'NAME': DB_REPLICA_NAME,
+        'HOST': config('DB_REPLICA_HOST', default=DATABASES['default']['HOST']),
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {**DATABASES['default'].get('TEST', {}), 'MIRROR': 'default'},
+    }
+    if DB_ENGINE == 'sqlite':
+        DATABASES[REPLICA_DATABASE]['NAME'] = f"file:{DB_REPLICA_NAME}?mode=ro"
+        DATABASES[REPLICA_DATABASE]['OPTIONS'] = {'uri': True, 'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000}
+        DATABASES[REPLICA_DATABASE]['CONN_MAX_AGE'] = 0
+DATABASE_ROUTERS = ['app.routers.ReplicaRouter']
+REPLICA_VIEWS = [
+    'exam_analytics', 'item_analysis', 'answer_similarity', 'exam_leaderboard', 'export_exam_results',
+    'teacher_dashboard', 'exam_progress',
+]
+REPLICA_MODELS = [
+    'app.examresult', 'app.studentresponse', 'app.examassignment', 'app.examstats', 'app.questionstats',
+]
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=15, cast=int)
+# Reports computed from the replica may trail the primary, so they are cached
+# for at most this long
+REPLICA_CACHE_TIMEOUT = config('REPLICA_CACHE_TIMEOUT', default=60, cast=int)
+
+
+# Cache
+# CACHE_BACKEND is 'locmem' (per process), 'file' (shared by the processes on
+# one host, e.g. web workers and `manage.py runjobs`) or the dotted path of
+# any Django cache backend, e.g. django.core.cache.backends.redis.RedisCache
+# with CACHE_LOCATION=redis://127.0.0.1:6379
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        'LOCATION': config(
+            'CACHE_LOCATION',
+            default=os.path.join(BASE_DIR, 'cache') if CACHE_BACKEND == 'file' else 'online-exam-portal',
+        ),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default=''),
     }
 }
+if CACHE_BACKEND in ('locmem', 'file'):
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)}
+# Caches that only one process sees can't be invalidated from another, so
+# features that rely on that are off by default without a shared backend
+SHARED_CACHE = CACHE_BACKEND not in ('locmem', 'dummy')
+
+# Cached page fragments are keyed on exam versions, so they can live long
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
+
+# Sessions
+# SESSION_MODE is 'db' (a django_session read on every request), 'cached_db'
+# (read from the cache, written through to the database), 'cache' or
+# 'signed_cookies' (no server-side storage at all), or an engine path. The
+# cached modes need a shared cache: a per-process copy goes stale as soon as
+# another process changes the session.
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_MODE = config('SESSION_MODE', default='cached_db' if SHARED_CACHE else 'db')
+SESSION_ENGINE = SESSION_ENGINES.get(SESSION_MODE, SESSION_MODE)
+
+# Cache the user loaded for each authenticated request; saving a user
+# invalidates it
+AUTH_USER_CACHE = config('AUTH_USER_CACHE', default=SHARED_CACHE, cast=bool)
+AUTHENTICATION_BACKENDS = [
+    'app.backends.CachedModelBackend' if AUTH_USER_CACHE else 'django.contrib.auth.backends.ModelBackend',
+]
 
 
 # Password validation
@@ -139,5 +275,37 @@ AUTH_USER_MODEL = 'app.CustomUser'
 
 LOGIN_URL = '/login/'
 
+# 'sync' grades submissions in the request, 'queued' spools them for
+# `manage.py grade_submissions`
+EXAM_SUBMISSION_MODE = config('EXAM_SUBMISSION_MODE', default='sync')
+
+# Autosaved answers are buffered in the cache and written to the database at
+# most once per AUTOSAVE_FLUSH_INTERVAL seconds. A per-process cache would
+# hide the buffer from other workers, so without a shared one every save is
+# written straight away.
+AUTOSAVE_FLUSH_INTERVAL = config('AUTOSAVE_FLUSH_INTERVAL', default=30 if SHARED_CACHE else 0, cast=int)
+
+# Cache answered counts per exam and student for exam_progress_view. Grading
+# updates them from whichever process grades, e.g. `manage.py grade_submissions`.
+EXAM_PROGRESS_COUNTERS = config('EXAM_PROGRESS_COUNTERS', default=SHARED_CACHE, cast=bool)
+
+# 'inline' computes analytics reports in the request, 'jobs' serves the last
+# result precomputed by `manage.py runjobs` and enqueues a refresh
+REPORTS_MODE = config('REPORTS_MODE', default='inline')
 
 
+
+# Logging: grading reports query count and wall time per submission
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'app': {
+            'handlers': ['console'],
+            'level': config('APP_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
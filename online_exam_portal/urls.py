@@ -65,6 +65,7 @@ urlpatterns = [
 
     path('exam/<int:exam_id>/instructions/', views.exam_instructions_view, name='exam_instructions'),
     path('exam/<int:exam_id>/start/', views.start_exam_view, name='start_exam'),
+    path('exam/<int:exam_id>/autosave/', views.autosave_answer_view, name='autosave_answer'),
     path('myresults/', views.student_result_view, name='student_result'),
    
 
@@ -84,6 +85,10 @@ urlpatterns = [
     path('teacher/assign_exam/<int:exam_id>/', views.assign_exam_to_student, name='assign_exam_to_student'),
     path('teacher/exam-progress/<int:exam_id>/', views.exam_progress_view, name='exam_progress'),
     path('teacher/exam/<int:exam_id>/analytics/', views.exam_analytics, name='exam_analytics'),
+    path('teacher/exam/<int:exam_id>/item-analysis/', views.item_analysis_view, name='item_analysis'),
+    path('teacher/exam/<int:exam_id>/similarity/', views.answer_similarity_view, name='answer_similarity'),
+    path('teacher/exam/<int:exam_id>/leaderboard/', views.exam_leaderboard_view, name='exam_leaderboard'),
+    path('teacher/exam/<int:exam_id>/export/', views.export_exam_results, name='export_exam_results'),
 
     path('contact/', views.contact_view, name='contact'),
 